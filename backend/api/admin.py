@@ -1,8 +1,10 @@
 from django.contrib import admin
-from .models import FeedSession, CachedFeed, Post, Flashcard, QueryLog
+from .models import FeedSession, CachedFeed, Post, Flashcard, QueryLog, ImageSearchResult, FeedJob
 
 admin.site.register(FeedSession)
 admin.site.register(CachedFeed)
 admin.site.register(Post)
 admin.site.register(Flashcard)
 admin.site.register(QueryLog)
+admin.site.register(ImageSearchResult)
+admin.site.register(FeedJob)
@@ -0,0 +1,129 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+AWS_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
+# HTTP connections each client keeps per endpoint; sized for the feed/image/write thread pools
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '50'))
+# adaptive: standard retries plus client-side rate limiting when AWS starts throttling
+AWS_RETRY_MODE = os.getenv('AWS_RETRY_MODE', 'adaptive')
+AWS_MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', '5'))
+AWS_CONNECT_TIMEOUT = float(os.getenv('AWS_CONNECT_TIMEOUT', '3'))
+
+# Read timeouts (seconds): Bedrock generations run long, DynamoDB calls should fail fast
+SERVICE_READ_TIMEOUTS = {
+    'bedrock-runtime': 120,
+    'dynamodb': 10,
+    'polly': 30,
+    'rekognition': 30,
+    's3': 30,
+}
+DEFAULT_READ_TIMEOUT = 60
+
+# Attempts per call where the default would multiply a long read timeout: a stalled
+# Bedrock generation should fail after ~120s, not after AWS_MAX_ATTEMPTS times that
+SERVICE_MAX_ATTEMPTS = {
+    'bedrock-runtime': int(os.getenv('BEDROCK_MAX_ATTEMPTS', '2')),
+}
+
+# boto3 sessions aren't thread safe, so clients are built one at a time and then shared
+# (clients themselves are safe to use from many threads)
+_session = boto3.session.Session()
+_lock = threading.Lock()
+_clients = {}
+_resources = {}
+
+
+def client_config(service):
+    """botocore Config used for every client of a service"""
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries={'mode': AWS_RETRY_MODE, 'max_attempts': SERVICE_MAX_ATTEMPTS.get(service, AWS_MAX_ATTEMPTS)},
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=SERVICE_READ_TIMEOUTS.get(service, DEFAULT_READ_TIMEOUT),
+    )
+
+
+def _credentials():
+    # None falls back to boto3's default credential chain (instance role, ~/.aws, ...)
+    return {
+        'aws_access_key_id': os.getenv('AWS_ACCESS_KEY_ID'),
+        'aws_secret_access_key': os.getenv('AWS_SECRET_ACCESS_KEY'),
+    }
+
+
+def get_client(service, region_name=None):
+    """Process-wide client for a service and region, created on first use"""
+    key = (service, region_name or AWS_REGION)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        if key not in _clients:
+            _clients[key] = _session.client(
+                service,
+                region_name=key[1],
+                config=client_config(service),
+                **_credentials()
+            )
+        return _clients[key]
+
+
+def get_resource(service, region_name=None):
+    """Process-wide boto3 resource (e.g. DynamoDB) with the same pooled config as get_client"""
+    key = (service, region_name or AWS_REGION)
+
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+
+    with _lock:
+        if key not in _resources:
+            _resources[key] = _session.resource(
+                service,
+                region_name=key[1],
+                config=client_config(service),
+                **_credentials()
+            )
+        return _resources[key]
+
+
+def _pool_stats(client):
+    """Connection-pool usage of one client (reads urllib3 internals, so best effort)"""
+    try:
+        manager = client._endpoint.http_session._manager
+        pools = [manager.pools[pool_key] for pool_key in manager.pools.keys()]
+    except (AttributeError, KeyError):
+        return None
+
+    # One pool per endpoint host; a connection is in use while it's checked out of the queue
+    capacity = AWS_MAX_POOL_CONNECTIONS * len(pools)
+    in_use = sum(pool.pool.maxsize - pool.pool.qsize() for pool in pools if pool.pool is not None)
+    return {
+        'pools': len(pools),
+        'capacity': capacity,
+        'in_use': in_use,
+        'opened': sum(pool.num_connections for pool in pools),
+        'requests': sum(pool.num_requests for pool in pools),
+        'utilization': round(in_use / capacity, 4) if capacity else 0.0,
+    }
+
+
+def get_aws_client_stats():
+    """Pool utilization for every client and resource created so far"""
+    with _lock:
+        clients = dict(_clients)
+        clients.update({key: resource.meta.client for key, resource in _resources.items()})
+
+    return {
+        'retry_mode': AWS_RETRY_MODE,
+        'max_pool_connections': AWS_MAX_POOL_CONNECTIONS,
+        'clients': {
+            f"{service}@{region}": _pool_stats(client)
+            for (service, region), client in clients.items()
+        }
+    }
@@ -0,0 +1,32 @@
+import threading
+
+
+def hit_rate(hits, lookups):
+    """Share of lookups that were hits, rounded for /cacheStats (0.0 before any lookup)"""
+    return round(hits / lookups, 4) if lookups else 0.0
+
+
+class CacheCounters:
+    """
+    Per-process counters for one cache, reported by /cacheStats.
+    hit_names are the counters that count as hits (e.g. cached "no result" answers);
+    every lookup is one of those or a miss.
+    """
+
+    def __init__(self, *names, hit_names=('hits',)):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys((*hit_names, 'misses', *names), 0)
+        self._hit_names = hit_names
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def stats(self):
+        """Snapshot of the counters plus hit_rate"""
+        with self._lock:
+            stats = dict(self._counts)
+
+        hits = sum(stats[name] for name in self._hit_names)
+        stats['hit_rate'] = hit_rate(hits, hits + stats['misses'])
+        return stats
@@ -0,0 +1,34 @@
+import time
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a feed generation runs out of its time budget"""
+
+
+class Deadline:
+    """
+    Time budget for one feed generation.
+    skipped counts the posts dropped because they couldn't finish in time.
+    """
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+        self.skipped = 0
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, default):
+        """Cap a per-call network timeout to what is left of the budget"""
+        return max(min(default, self.remaining()), 0.1)
+
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+    @property
+    def partial(self):
+        return self.skipped > 0
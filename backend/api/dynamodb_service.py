@@ -1,16 +1,25 @@
-import boto3
 import os
+import base64
+import hashlib
+import heapq
+import itertools
+import random
+import secrets
+import threading
+import time
+import zlib
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 import json
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource(
-    'dynamodb',
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
+from .aws_clients import get_resource
+from .cache_counters import hit_rate
+from .study_cache import get_cached_study_set, invalidate_study_set
+
+dynamodb = get_resource('dynamodb')
 
 # Table names - customize these in .env if needed
 POSTS_TABLE = os.getenv('DYNAMODB_POSTS_TABLE', 'quickly-posts')
@@ -18,82 +27,588 @@ LIKES_TABLE = os.getenv('DYNAMODB_LIKES_TABLE', 'quickly-likes')
 USERS_TABLE = os.getenv('DYNAMODB_USERS_TABLE', 'quickly-users')
 FLASHCARDS_TABLE = os.getenv('DYNAMODB_FLASHCARDS_TABLE', 'quickly-flashcards')
 QUIZZES_TABLE = os.getenv('DYNAMODB_QUIZZES_TABLE', 'quickly-quizzes')
+# One header item per (userId, topic) owning feed-level isPrivate / deletedByCreator
+FEEDS_TABLE = os.getenv('DYNAMODB_FEEDS_TABLE', 'quickly-feeds')
+# Written to the feeds table once backfill_feed_headers has completed; until then topic
+# listings also scan posts for feeds saved before headers existed
+FEED_HEADERS_BACKFILL_MARKER = {'userId': '#migrations', 'topic': 'feed-headers'}
+
+# GSI over posts carrying publicShard (HASH) + createdAt (RANGE); visibility is resolved
+# through the feed headers when reading. Posts are spread over several shard keys so the
+# public feed isn't one hot partition
+PUBLIC_FEED_INDEX = 'public-feed-index'
+PUBLIC_FEED_SHARDS = int(os.getenv('PUBLIC_FEED_SHARDS', '8'))
+PUBLIC_FEED_SHARD_KEYS = tuple(f"public#{n}" for n in range(PUBLIC_FEED_SHARDS))
+# Index keys include the table keys, so a public-feed cursor position has all four
+PUBLIC_FEED_CURSOR_KEY = ('userId', 'postId', 'publicShard', 'createdAt')
+PUBLIC_FEED_MAX_PAGE_SIZE = 50
+# How long the shuffled public feed reuses one snapshot of public posts
+PUBLIC_FEED_SNAPSHOT_TTL_SECONDS = int(os.getenv('PUBLIC_FEED_SNAPSHOT_TTL_SECONDS', '300'))
+
+# Page sizes for the user-scoped list endpoints (getFeed, getLikedPosts, getSavedFlashcards, ...)
+USER_PAGE_DEFAULT_LIMIT = int(os.getenv('USER_PAGE_DEFAULT_LIMIT', '100'))
+USER_PAGE_MAX_LIMIT = 500
+
+ACTIVE_POST_FILTER = 'attribute_not_exists(deletedByCreator) OR deletedByCreator = :false'
+
+# BatchWriteItem accepts at most 25 put/delete requests per call, BatchGetItem 100 keys
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+# UnprocessedItems / UnprocessedKeys are retried with exponential backoff (full jitter) this many times
+BATCH_WRITE_MAX_RETRIES = int(os.getenv('DYNAMODB_BATCH_WRITE_MAX_RETRIES', '8'))
+BATCH_WRITE_BASE_DELAY = float(os.getenv('DYNAMODB_BATCH_WRITE_BASE_DELAY', '0.05'))
+BATCH_WRITE_MAX_DELAY = 2.0
+# Batches of one bulk write are sent concurrently on this many threads
+DYNAMODB_WRITE_WORKERS = int(os.getenv('DYNAMODB_WRITE_WORKERS', '4'))
+
+write_executor = ThreadPoolExecutor(
+    max_workers=DYNAMODB_WRITE_WORKERS,
+    thread_name_prefix='dynamodb-write'
+)
 
-def get_posts_table():
-    """Get or create posts table"""
+# Hot posts kept in memory when hydrating liked posts (LRU; short TTL so counters stay fresh)
+POST_CACHE_MAX_ENTRIES = int(os.getenv('POST_CACHE_MAX_ENTRIES', '1000'))
+POST_CACHE_TTL_SECONDS = float(os.getenv('POST_CACHE_TTL_SECONDS', '30'))
+
+_post_cache = OrderedDict()
+_post_cache_lock = threading.Lock()
+_post_cache_stats = {'hits': 0, 'misses': 0}
+
+_public_snapshot = None
+_public_snapshot_lock = threading.Lock()
+
+PROVISIONED_THROUGHPUT = {
+    'ReadCapacityUnits': 5,
+    'WriteCapacityUnits': 5
+}
+
+PUBLIC_FEED_INDEX_DEFINITION = {
+    'IndexName': PUBLIC_FEED_INDEX,
+    'KeySchema': [
+        {'AttributeName': 'publicShard', 'KeyType': 'HASH'},
+        {'AttributeName': 'createdAt', 'KeyType': 'RANGE'}
+    ],
+    'Projection': {'ProjectionType': 'ALL'},
+    'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+}
+
+# Schema of every table this module uses; provision_tables creates them (and missing GSIs)
+TABLE_DEFINITIONS = {
+    POSTS_TABLE: {
+        'KeySchema': [
+            {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
+            {'AttributeName': 'postId', 'KeyType': 'RANGE'}  # Sort key
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'postId', 'AttributeType': 'S'},
+            {'AttributeName': 'topic', 'AttributeType': 'S'},
+            {'AttributeName': 'publicShard', 'AttributeType': 'S'},
+            {'AttributeName': 'createdAt', 'AttributeType': 'S'},
+        ],
+        'GlobalSecondaryIndexes': [
+            {
+                'IndexName': 'topic-index',
+                'KeySchema': [
+                    {'AttributeName': 'topic', 'KeyType': 'HASH'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+                'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+            },
+            PUBLIC_FEED_INDEX_DEFINITION
+        ],
+        'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+    },
+    LIKES_TABLE: {
+        'KeySchema': [
+            {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
+            {'AttributeName': 'postId', 'KeyType': 'RANGE'}  # Sort key
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'postId', 'AttributeType': 'S'},
+        ],
+        'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+    },
+    FEEDS_TABLE: {
+        'KeySchema': [
+            {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
+            {'AttributeName': 'topic', 'KeyType': 'RANGE'}  # Sort key
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'topic', 'AttributeType': 'S'},
+        ],
+        'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+    },
+    FLASHCARDS_TABLE: {
+        'KeySchema': [
+            {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
+            {'AttributeName': 'flashcardId', 'KeyType': 'RANGE'}  # Sort key
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'flashcardId', 'AttributeType': 'S'},
+        ],
+        'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+    },
+    QUIZZES_TABLE: {
+        'KeySchema': [
+            {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
+            {'AttributeName': 'quizId', 'KeyType': 'RANGE'}  # Sort key
+        ],
+        'AttributeDefinitions': [
+            {'AttributeName': 'userId', 'AttributeType': 'S'},
+            {'AttributeName': 'quizId', 'AttributeType': 'S'},
+        ],
+        'ProvisionedThroughput': PROVISIONED_THROUGHPUT
+    },
+}
+
+# Create a missing table on first use (handy in development); otherwise run manage.py provision_tables
+DYNAMODB_AUTO_CREATE_TABLES = os.getenv('DYNAMODB_AUTO_CREATE_TABLES', 'True') == 'True'
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _create_table(name):
+    print(f"🛠️ Creating DynamoDB table {name}")
+    table = dynamodb.create_table(TableName=name, **TABLE_DEFINITIONS[name])
+    table.wait_until_exists()
+    return table
+
+
+def _load_table(name, create):
+    """Describe a table once, creating it if it's missing and `create` is set, and check its key schema"""
+    table = dynamodb.Table(name)
     try:
-        table = dynamodb.Table(POSTS_TABLE)
         table.load()
+    except ClientError as e:
+        # Only a missing table is created; throttling, auth errors etc. are raised
+        if e.response['Error']['Code'] != 'ResourceNotFoundException' or not create:
+            raise
+        table = _create_table(name)
+
+    expected = {key['AttributeName']: key['KeyType'] for key in TABLE_DEFINITIONS[name]['KeySchema']}
+    actual = {key['AttributeName']: key['KeyType'] for key in table.key_schema}
+    if actual != expected:
+        raise RuntimeError(f"DynamoDB table {name} has key schema {actual}, expected {expected}")
+
+    existing = {index['IndexName'] for index in (table.global_secondary_indexes or [])}
+    for index in TABLE_DEFINITIONS[name].get('GlobalSecondaryIndexes', []):
+        if index['IndexName'] not in existing:
+            print(f"⚠️ {name} has no {index['IndexName']} yet (run manage.py provision_tables)")
+
+    return table
+
+
+def get_table(name):
+    """
+    Process-wide cached Table handle. The table is described (and created if missing, with
+    DYNAMODB_AUTO_CREATE_TABLES) once per process instead of before every operation.
+    """
+    table = _tables.get(name)
+    if table is not None:
         return table
-    except:
-        # Table doesn't exist, create it
-        table = dynamodb.create_table(
-            TableName=POSTS_TABLE,
-            KeySchema=[
-                {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
-                {'AttributeName': 'postId', 'KeyType': 'RANGE'}  # Sort key
-            ],
+
+    with _tables_lock:
+        if name not in _tables:
+            _tables[name] = _load_table(name, create=DYNAMODB_AUTO_CREATE_TABLES)
+        return _tables[name]
+
+
+def _wait_for_indexes(name):
+    while True:
+        description = dynamodb.meta.client.describe_table(TableName=name)['Table']
+        statuses = [index.get('IndexStatus') for index in description.get('GlobalSecondaryIndexes', [])]
+        if all(status == 'ACTIVE' for status in statuses):
+            return
+        time.sleep(5)
+
+
+def ensure_table_indexes(name, wait=True):
+    """Create the GSIs a table is missing (DynamoDB allows one index creation at a time). Returns their names."""
+    definition = TABLE_DEFINITIONS[name]
+    created = []
+
+    for index in definition.get('GlobalSecondaryIndexes', []):
+        description = dynamodb.meta.client.describe_table(TableName=name)['Table']
+        existing = {existing_index['IndexName'] for existing_index in description.get('GlobalSecondaryIndexes', [])}
+        if index['IndexName'] in existing:
+            continue
+
+        _wait_for_indexes(name)  # An index still being built blocks creating the next one
+
+        key_attributes = {key['AttributeName'] for key in index['KeySchema']}
+        dynamodb.meta.client.update_table(
+            TableName=name,
             AttributeDefinitions=[
-                {'AttributeName': 'userId', 'AttributeType': 'S'},
-                {'AttributeName': 'postId', 'AttributeType': 'S'},
-                {'AttributeName': 'topic', 'AttributeType': 'S'},
+                attribute for attribute in definition['AttributeDefinitions']
+                if attribute['AttributeName'] in key_attributes
             ],
-            GlobalSecondaryIndexes=[
-                {
-                    'IndexName': 'topic-index',
-                    'KeySchema': [
-                        {'AttributeName': 'topic', 'KeyType': 'HASH'}
-                    ],
-                    'Projection': {'ProjectionType': 'ALL'},
-                    'ProvisionedThroughput': {
-                        'ReadCapacityUnits': 5,
-                        'WriteCapacityUnits': 5
-                    }
-                }
-            ],
-            ProvisionedThroughput={
-                'ReadCapacityUnits': 5,
-                'WriteCapacityUnits': 5
-            }
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
         )
-        table.wait_until_exists()
-        return table
+        created.append(index['IndexName'])
 
-def get_likes_table():
-    """Get or create likes table"""
+        if wait:
+            _wait_for_indexes(name)
+
+    return created
+
+
+def provision_tables(wait=True):
+    """Create every missing table and GSI. Returns {table name: list of what was created}."""
+    report = {}
+
+    for name in TABLE_DEFINITIONS:
+        created = []
+        try:
+            dynamodb.meta.client.describe_table(TableName=name)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ResourceNotFoundException':
+                raise
+            _create_table(name)
+            created.append('table')
+
+        created.extend(ensure_table_indexes(name, wait=wait))
+        report[name] = created
+
+    with _tables_lock:
+        _tables.clear()  # Pick up the new indexes on next use
+
+    return report
+
+
+def encode_cursor(data):
+    """Opaque pagination cursor (url-safe base64 JSON) handed to clients"""
+    return base64.urlsafe_b64encode(json.dumps(data, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
     try:
-        table = dynamodb.Table(LIKES_TABLE)
-        table.load()
-        return table
-    except:
-        # Table doesn't exist, create it
-        table = dynamodb.create_table(
-            TableName=LIKES_TABLE,
-            KeySchema=[
-                {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
-                {'AttributeName': 'postId', 'KeyType': 'RANGE'}  # Sort key
-            ],
-            AttributeDefinitions=[
-                {'AttributeName': 'userId', 'AttributeType': 'S'},
-                {'AttributeName': 'postId', 'AttributeType': 'S'},
-            ],
-            ProvisionedThroughput={
-                'ReadCapacityUnits': 5,
-                'WriteCapacityUnits': 5
-            }
-        )
-        table.wait_until_exists()
-        return table
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def cursor_key(key, attributes, **expected):
+    """
+    Check a decoded cursor is an ExclusiveStartKey with exactly these string attributes
+    (and the `expected` values), so a forged cursor can't reach another partition or range.
+    Raises ValueError otherwise.
+    """
+    if (
+        not isinstance(key, dict)
+        or set(key) != set(attributes)
+        or not all(isinstance(value, str) for value in key.values())
+        or any(key[name] != value for name, value in expected.items())
+    ):
+        raise ValueError('Invalid cursor')
+    return key
+
+
+def topic_key_prefix(topic):
+    """postIds start with the topic ('{topic}_{timestamp}_{i}') so a topic is a sort-key range"""
+    return f"{topic}_"
+
+
+def public_shard_for(post_id):
+    """Stable public-feed shard key for a post"""
+    return f"public#{zlib.crc32(post_id.encode()) % PUBLIC_FEED_SHARDS}"
+
+
+def iter_query(table, **query_kwargs):
+    """Lazily yield every item a query matches, fetching one DynamoDB page (<= 1MB) at a time"""
+    while True:
+        response = table.query(**query_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def page_limit(limit, cursor=None):
+    """
+    Clamp a client-supplied page size to 1..USER_PAGE_MAX_LIMIT (raises ValueError if not a number).
+    None when neither a limit nor a cursor was sent: clients that predate paging get everything.
+    """
+    if limit is None:
+        return USER_PAGE_DEFAULT_LIMIT if cursor else None
+    return max(1, min(int(limit), USER_PAGE_MAX_LIMIT))
+
+
+def query_page(table, user_id, limit=None, cursor=None, keep=None, sort_key='postId', sort_prefix=None, **query_kwargs):
+    """
+    One page of up to `limit` items from a query on a user's partition (every item when
+    neither `limit` nor `cursor` is given, see page_limit).
+    Keeps following LastEvaluatedKey while a FilterExpression (or the `keep` predicate)
+    leaves the page short; the cursor is the key to resume from, so has_more can be True
+    with an empty page after it.
+    The cursor must be a key of this table in the user's partition (and start with
+    `sort_prefix` when the query reads a sort-key range).
+    Returns {'items', 'next_cursor', 'has_more'}; raises ValueError for a bad cursor.
+    """
+    limit = page_limit(limit, cursor)
+
+    if cursor:
+        start_key = cursor_key(decode_cursor(cursor), ('userId', sort_key), userId=user_id)
+        if sort_prefix and not start_key[sort_key].startswith(sort_prefix):
+            raise ValueError('Invalid cursor')
+        query_kwargs['ExclusiveStartKey'] = start_key
+
+    items = []
+    while True:
+        if limit is not None:
+            query_kwargs['Limit'] = limit - len(items)
+        response = table.query(**query_kwargs)
+        items.extend(item for item in response.get('Items', []) if keep is None or keep(item))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key or (limit is not None and len(items) >= limit):
+            break
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(last_key) if last_key else None,
+        'has_more': bool(last_key)
+    }
+
+
+def _backoff_delay(attempt):
+    return random.uniform(0, min(BATCH_WRITE_MAX_DELAY, BATCH_WRITE_BASE_DELAY * 2 ** attempt))
 
-def save_posts(user_id, topic, posts, username=None, is_private=False):
-    """Save generated posts to DynamoDB"""
+
+def _write_batch(table_name, write_requests):
+    """Send one BatchWriteItem call, retrying whatever comes back in UnprocessedItems"""
+    pending = {table_name: write_requests}
+
+    for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+        response = dynamodb.batch_write_item(RequestItems=pending)
+        pending = response.get('UnprocessedItems') or {}
+        if not pending:
+            return
+
+        if attempt < BATCH_WRITE_MAX_RETRIES:
+            delay = _backoff_delay(attempt)
+            print(f"⚠️ {len(pending[table_name])} unprocessed writes to {table_name}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    raise RuntimeError(
+        f"{len(pending[table_name])} writes to {table_name} still unprocessed after {BATCH_WRITE_MAX_RETRIES} retries"
+    )
+
+
+def batch_put_items(table_name, items, parallel=True):
+    """
+    Put many items with BatchWriteItem, 25 per call instead of one round trip each.
+    With parallel=True the batches are sent concurrently on the write pool.
+    Items in one call must have distinct keys.
+    """
+    write_requests = [{'PutRequest': {'Item': item}} for item in items]
+    batches = [
+        write_requests[start:start + BATCH_WRITE_SIZE]
+        for start in range(0, len(write_requests), BATCH_WRITE_SIZE)
+    ]
+
+    if parallel and len(batches) > 1:
+        futures = [write_executor.submit(_write_batch, table_name, batch) for batch in batches]
+        for future in futures:
+            future.result()
+    else:
+        for batch in batches:
+            _write_batch(table_name, batch)
+
+    return len(write_requests)
+
+
+def batch_get_items(table_name, keys, projection=None):
+    """
+    Fetch items by primary key with BatchGetItem, 100 keys per call, retrying UnprocessedKeys.
+    Keys must be distinct; missing items are left out and the order is not preserved.
+    """
+    items = []
+
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {'Keys': keys[start:start + BATCH_GET_SIZE]}
+        if projection:
+            request['ProjectionExpression'] = projection
+        pending = {table_name: request}
+
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            response = dynamodb.batch_get_item(RequestItems=pending)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            pending = response.get('UnprocessedKeys') or {}
+            if not pending:
+                break
+            if attempt < BATCH_WRITE_MAX_RETRIES:
+                time.sleep(_backoff_delay(attempt))
+        else:
+            raise RuntimeError(
+                f"{len(pending[table_name]['Keys'])} reads from {table_name} still unprocessed after {BATCH_WRITE_MAX_RETRIES} retries"
+            )
+
+    return items
+
+
+def get_posts_table():
+    """Posts table (cached handle, see get_table)"""
+    return get_table(POSTS_TABLE)
+
+def get_likes_table():
+    """Likes table (cached handle, see get_table)"""
+    return get_table(LIKES_TABLE)
+
+def _cache_post(post):
+    with _post_cache_lock:
+        key = (post['userId'], post['postId'])
+        _post_cache[key] = (time.monotonic(), post)
+        _post_cache.move_to_end(key)
+        while len(_post_cache) > POST_CACHE_MAX_ENTRIES:
+            _post_cache.popitem(last=False)
+
+def forget_post(owner_id, post_id):
+    """Drop a post from the hot-post cache (its counter or content just changed)"""
+    with _post_cache_lock:
+        _post_cache.pop((owner_id, post_id), None)
+
+def get_posts_by_keys(keys):
+    """
+    (ownerId, postId) -> post for many posts: hot ones from the in-process cache, the rest
+    with chunked BatchGetItem. Posts that don't exist are left out; callers get copies.
+    """
+    posts = {}
+    missing = []
+    now = time.monotonic()
+
+    with _post_cache_lock:
+        for key in set(keys):
+            entry = _post_cache.get(key)
+            if entry and now - entry[0] < POST_CACHE_TTL_SECONDS:
+                _post_cache.move_to_end(key)
+                posts[key] = dict(entry[1])
+            else:
+                missing.append(key)
+        _post_cache_stats['hits'] += len(posts)
+        _post_cache_stats['misses'] += len(missing)
+
+    if missing:
+        fetched = batch_get_items(
+            get_posts_table().name,
+            [{'userId': owner_id, 'postId': post_id} for owner_id, post_id in missing]
+        )
+        for post in fetched:
+            _cache_post(post)
+            posts[(post['userId'], post['postId'])] = dict(post)
+
+    return posts
+
+def get_post_cache_stats():
+    """Hit/miss counters for the hot-post cache in this process"""
+    with _post_cache_lock:
+        stats = dict(_post_cache_stats)
+        stats['entries'] = len(_post_cache)
+
+    stats['hit_rate'] = hit_rate(stats['hits'], stats['hits'] + stats['misses'])
+    stats['max_entries'] = POST_CACHE_MAX_ENTRIES
+    stats['ttl_seconds'] = POST_CACHE_TTL_SECONDS
+    return stats
+
+def get_feeds_table():
+    """Feeds table - one header item per user and topic (cached handle, see get_table)"""
+    return get_table(FEEDS_TABLE)
+
+_feed_headers_backfilled = False
+
+def feed_headers_backfilled():
+    """True once every legacy feed has a header (only the positive answer is remembered)"""
+    global _feed_headers_backfilled
+    if not _feed_headers_backfilled:
+        marker = get_feeds_table().get_item(Key=FEED_HEADERS_BACKFILL_MARKER).get('Item')
+        _feed_headers_backfilled = marker is not None
+    return _feed_headers_backfilled
+
+def get_feed_header(user_id, topic):
+    """The header for one feed, or None for a feed saved before feed headers existed"""
+    response = get_feeds_table().get_item(Key={'userId': user_id, 'topic': topic})
+    return response.get('Item')
+
+def get_user_feed_headers(user_id):
+    """topic -> header for every feed of a user"""
+    headers = iter_query(
+        get_feeds_table(),
+        KeyConditionExpression='userId = :uid',
+        ExpressionAttributeValues={':uid': user_id}
+    )
+    return {header['topic']: header for header in headers}
+
+def get_feed_headers(pairs):
+    """(userId, topic) -> header for many feeds at once; feeds without a header are left out"""
+    keys = [{'userId': user_id, 'topic': topic} for user_id, topic in set(pairs) if topic]
+    headers = batch_get_items(get_feeds_table().name, keys)
+    return {(header['userId'], header['topic']): header for header in headers}
+
+def hidden_by_feed(post, header):
+    """
+    True when the creator deleted this post: flagged on the post itself (posts deleted before
+    feed headers existed) or created before the feed header's deletedAt.
+    """
+    if post.get('deletedByCreator', False):
+        return True
+    deleted_at = header.get('deletedAt') if header else None
+    return bool(deleted_at) and post.get('createdAt', '') <= deleted_at
+
+def apply_feed_header(post, header):
+    """The feed header's isPrivate wins over the copy stored on the post when it was saved"""
+    if header and 'isPrivate' in header:
+        post['isPrivate'] = header['isPrivate']
+    return post
+
+def _visible_public_posts(posts, headers):
+    """Drop private and deleted posts; `headers` caches (userId, topic) -> header between calls"""
+    missing = {(post['userId'], post.get('topic', '')) for post in posts} - headers.keys()
+    if missing:
+        fetched = get_feed_headers(missing)
+        for pair in missing:
+            headers[pair] = fetched.get(pair)
+
+    visible = []
+    for post in posts:
+        header = headers[(post['userId'], post.get('topic', ''))]
+        if hidden_by_feed(post, header) or apply_feed_header(post, header).get('isPrivate', False):
+            continue
+        visible.append(post)
+    return visible
+
+def save_posts(user_id, topic, posts, username=None, is_private=False, parallel=True):
+    """Save generated posts to DynamoDB (batched, see batch_put_items)"""
     table = get_posts_table()
 
     saved_posts = []
     timestamp = datetime.now().timestamp()
+    now = datetime.now().isoformat()
+
+    # Header first, so a private feed is never briefly visible through a stale public header.
+    # Saving into a deleted topic revives it; posts from before deletedAt stay hidden.
+    get_feeds_table().update_item(
+        Key={'userId': user_id, 'topic': topic},
+        UpdateExpression=(
+            'SET isPrivate = :private, deletedByCreator = :false, username = :username, updatedAt = :now, '
+            'createdAt = if_not_exists(createdAt, :now), postCount = if_not_exists(postCount, :zero) + :count'
+        ),
+        ExpressionAttributeValues={
+            ':private': is_private,
+            ':false': False,
+            ':username': username or user_id[:8],
+            ':now': now,
+            ':zero': 0,
+            ':count': len(posts)
+        }
+    )
 
     for i, post in enumerate(posts):
-        post_id = f"{topic}_{timestamp}_{i}"
+        post_id = f"{topic_key_prefix(topic)}{timestamp}_{i}"
 
         item = {
             'userId': user_id,
@@ -110,128 +625,536 @@ def save_posts(user_id, topic, posts, username=None, is_private=False):
             'comments': 0,
             'shares': 0,
             'createdAt': datetime.now().isoformat(),
+            # Indexed even when private: the feed header decides visibility, so toggling needs no post writes
+            'publicShard': public_shard_for(post_id),
         }
 
-        table.put_item(Item=item)
         saved_posts.append(item)
 
-    return saved_posts
+    batch_put_items(table.name, saved_posts, parallel=parallel)
 
-def get_user_posts(user_id):
-    """Get all posts for a user (excluding deleted ones)"""
-    table = get_posts_table()
+    return saved_posts
 
-    response = table.query(
+def iter_user_posts(user_id):
+    """Lazily yield every post for a user (excluding deleted ones)"""
+    headers = get_user_feed_headers(user_id)
+    posts = iter_query(
+        get_posts_table(),
         KeyConditionExpression='userId = :uid',
-        ExpressionAttributeValues={':uid': user_id}
+        FilterExpression=ACTIVE_POST_FILTER,
+        ExpressionAttributeValues={':uid': user_id, ':false': False}
+    )
+    for post in posts:
+        header = headers.get(post.get('topic'))
+        if not hidden_by_feed(post, header):
+            yield apply_feed_header(post, header)
+
+def get_user_posts(user_id, limit=None, cursor=None):
+    """One page of posts for a user (excluding deleted ones): {'posts', 'next_cursor', 'has_more'}"""
+    headers = get_user_feed_headers(user_id)
+    page = query_page(
+        get_posts_table(),
+        user_id,
+        limit,
+        cursor,
+        keep=lambda post: not hidden_by_feed(post, headers.get(post.get('topic'))),
+        KeyConditionExpression='userId = :uid',
+        FilterExpression=ACTIVE_POST_FILTER,
+        ExpressionAttributeValues={':uid': user_id, ':false': False}
     )
 
-    posts = response.get('Items', [])
-
-    # Filter out posts marked as deleted by creator
-    active_posts = [p for p in posts if not p.get('deletedByCreator', False)]
-
-    return active_posts
+    return {
+        'posts': [apply_feed_header(post, headers.get(post.get('topic'))) for post in page['items']],
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more']
+    }
 
-def get_public_feed(limit=10, offset=0, seed=None):
-    """Get all public posts from all users - with pagination for infinite scroll"""
+def _load_public_posts():
+    """Read every public, non-deleted post (public-feed index, or a Scan if the index isn't there yet)"""
     table = get_posts_table()
+    posts = []
+    headers = {}
 
-    # Scan table for public posts (isPrivate = False or not set)
-    # AND not deleted by creator
-    response = table.scan(
-        FilterExpression='(attribute_not_exists(isPrivate) OR isPrivate = :false) AND (attribute_not_exists(deletedByCreator) OR deletedByCreator = :false)',
-        ExpressionAttributeValues={
+    try:
+        for n in range(PUBLIC_FEED_SHARDS):
+            query_kwargs = {
+                'IndexName': PUBLIC_FEED_INDEX,
+                'KeyConditionExpression': 'publicShard = :shard',
+                'ExpressionAttributeValues': {':shard': f"public#{n}"}
+            }
+            posts.extend(_visible_public_posts(list(iter_query(table, **query_kwargs)), headers))
+        return posts
+
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ValidationException':
+            raise
+        print(f"⚠️ {PUBLIC_FEED_INDEX} missing, scanning posts (run manage.py backfill_public_feed)")
+
+    # Scan table for posts not deleted by creator; privacy is resolved through the feed headers
+    scan_kwargs = {
+        'FilterExpression': ACTIVE_POST_FILTER,
+        'ExpressionAttributeValues': {
             ':false': False
         }
-    )
+    }
+
+    # Follow LastEvaluatedKey so results don't stop at the 1MB page limit
+    posts = []
+    while True:
+        response = table.scan(**scan_kwargs)
+        posts.extend(_visible_public_posts(response.get('Items', []), headers))
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return posts
 
-    posts = response.get('Items', [])
 
-    # Randomize with seed for consistent order across pagination
-    import random
+def get_public_snapshot():
+    """
+    Process-wide snapshot of public posts, rebuilt every PUBLIC_FEED_SNAPSHOT_TTL_SECONDS.
+    Posts are sorted by (createdAt, postId) so every worker sees the same order for the same data.
+    While one thread rebuilds, other requests keep reading the previous snapshot.
+    """
+    global _public_snapshot
 
-    if seed:
-        random.seed(seed)  # Use seed for consistent randomization
+    snapshot = _public_snapshot
+    if snapshot and time.monotonic() - snapshot['built_at'] < PUBLIC_FEED_SNAPSHOT_TTL_SECONDS:
+        return snapshot
 
-    random.shuffle(posts)
+    # Only one thread rebuilds; the rest use the stale snapshot if there is one
+    if not _public_snapshot_lock.acquire(blocking=snapshot is None):
+        return snapshot
+
+    try:
+        if _public_snapshot is not snapshot:
+            return _public_snapshot  # Someone else rebuilt it while we waited
+
+        posts = sorted(_load_public_posts(), key=lambda p: (p.get('createdAt', ''), p['postId']))
+        version = hashlib.sha256(
+            '\n'.join(p['postId'] for p in posts).encode()
+        ).hexdigest()[:12]
+
+        _public_snapshot = {'posts': posts, 'version': version, 'built_at': time.monotonic()}
+        return _public_snapshot
+    finally:
+        _public_snapshot_lock.release()
+
+
+def _expire_public_snapshot():
+    """Make the next shuffled-feed request in this process rebuild the snapshot (after a privacy change)"""
+    snapshot = _public_snapshot
+    if snapshot:
+        snapshot['built_at'] = float('-inf')
+
+
+def _feistel_round_keys(seed):
+    digest = hashlib.sha256(str(seed).encode()).digest()
+    return [int.from_bytes(digest[i * 8:(i + 1) * 8], 'big') for i in range(4)]
+
+
+def seeded_position(seed_keys, index, size):
+    """
+    Where item `index` lands in the seeded shuffle of range(size), in O(1) expected time.
+    A 4-round Feistel network is a bijection on [0, 4^k); cycle-walking restricts it to [0, size).
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+
+    x = index
+    while True:
+        left, right = x >> half_bits, x & mask
+        for key in seed_keys:
+            mixed = hashlib.blake2b(f"{key}:{right}".encode(), digest_size=8).digest()
+            left, right = right, left ^ (int.from_bytes(mixed, 'big') & mask)
+        x = (left << half_bits) | right
+        if x < size:
+            return x
+
+
+def get_public_feed(limit=10, offset=0, seed=None):
+    """
+    Get all public posts from all users - with pagination for infinite scroll
+    Posts come from the shared public snapshot in a deterministic order for each seed, and
+    each page only computes its own `limit` positions - nothing is copied or shuffled per request.
+    """
+    snapshot = get_public_snapshot()
+    posts = snapshot['posts']
+    total = len(posts)
+
+    # Without a seed every request gets its own random order (as before)
+    seed_keys = _feistel_round_keys(seed if seed else secrets.token_hex(8))
 
     # Return paginated posts
-    start = offset
-    end = offset + limit
+    start = max(offset, 0)
+    end = min(start + limit, total)
 
     return {
-        'posts': posts[start:end],
-        'total': len(posts),
-        'has_more': end < len(posts)
+        'posts': [posts[seeded_position(seed_keys, i, total)] for i in range(start, end)],
+        'total': total,
+        'has_more': end < total,
+        'snapshot': snapshot['version']
     }
 
-def get_user_topics(user_id):
-    """Get unique topics for a user (excluding deleted ones)"""
+def get_public_feed_page(limit=10, cursor=None):
+    """
+    Newest-first public feed page read from the public-feed GSI.
+    Each shard is read until it yields `limit` visible posts (or runs out) after its position in
+    the cursor and the results are merged, so a page costs O(shards * limit) reads plus whatever
+    private or deleted posts sit in between, regardless of table size.
+    The cursor maps each shard to the index key of the last post served from it (or None once
+    the shard is exhausted).
+    """
     table = get_posts_table()
-
-    response = table.query(
-        KeyConditionExpression='userId = :uid',
-        ExpressionAttributeValues={':uid': user_id}
+    limit = max(1, min(int(limit), PUBLIC_FEED_MAX_PAGE_SIZE))
+
+    if cursor:
+        positions = decode_cursor(cursor)
+        if not isinstance(positions, dict) or not set(positions) <= set(PUBLIC_FEED_SHARD_KEYS):
+            raise ValueError('Invalid cursor')
+        for shard, position in positions.items():
+            # {} is a shard not read yet, None one that's exhausted
+            if position:
+                cursor_key(position, PUBLIC_FEED_CURSOR_KEY, publicShard=shard)
+            elif position not in ({}, None):
+                raise ValueError('Invalid cursor')
+    else:
+        positions = {shard: {} for shard in PUBLIC_FEED_SHARD_KEYS}
+
+    shard_items = {}
+    shard_exhausted = {}
+    headers = {}
+    for shard, position in positions.items():
+        if position is None:
+            continue
+
+        query_kwargs = {
+            'IndexName': PUBLIC_FEED_INDEX,
+            'KeyConditionExpression': 'publicShard = :shard',
+            'ExpressionAttributeValues': {':shard': shard},
+            'ScanIndexForward': False,  # Newest first
+            'Limit': limit
+        }
+        if position:
+            query_kwargs['ExclusiveStartKey'] = position
+
+        items = []
+        while True:
+            response = table.query(**query_kwargs)
+            items.extend(_visible_public_posts(response.get('Items', []), headers))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key or len(items) >= limit:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
+
+        shard_items[shard] = items
+        shard_exhausted[shard] = last_key is None
+
+    # k-way merge by createdAt, always taking from the head of a shard's (newest-first) list
+    merged = heapq.merge(
+        *[[(item.get('createdAt', ''), shard, i) for i, item in enumerate(items)] for shard, items in shard_items.items()],
+        key=lambda entry: entry[0],
+        reverse=True
     )
+    served = {shard: 0 for shard in shard_items}
+    page = []
+    for _, shard, i in itertools.islice(merged, limit):
+        page.append(shard_items[shard][i])
+        served[shard] = i + 1
+
+    # Advance each shard past the posts it contributed to this page
+    next_positions = dict(positions)
+    for shard, items in shard_items.items():
+        if served[shard]:
+            last = items[served[shard] - 1]
+            next_positions[shard] = {
+                'userId': last['userId'],
+                'postId': last['postId'],
+                'publicShard': shard,
+                'createdAt': last['createdAt']
+            }
+        if shard_exhausted[shard] and served[shard] == len(items):
+            next_positions[shard] = None
 
-    posts = response.get('Items', [])
+    has_more = any(position is not None for position in next_positions.values())
 
-    # Filter out posts marked as deleted by creator
-    active_posts = [p for p in posts if not p.get('deletedByCreator', False)]
+    return {
+        'posts': page,
+        'next_cursor': encode_cursor(next_positions) if has_more else None,
+        'has_more': has_more
+    }
 
-    # Extract unique topics from active posts only
-    topics = list(set(post.get('topic') for post in active_posts if post.get('topic')))
+def _scan_user_topics(user_id, skip_topics=()):
+    """
+    topic -> newest createdAt from the user's posts, for feeds saved before feed headers
+    existed (only needed until backfill_feed_headers has run). skip_topics already have a header.
+    """
+    # Only the two attributes needed are read, and only one entry per topic is kept in memory
+    posts = iter_query(
+        get_posts_table(),
+        KeyConditionExpression='userId = :uid',
+        FilterExpression=ACTIVE_POST_FILTER,
+        ProjectionExpression='topic, createdAt',
+        ExpressionAttributeValues={':uid': user_id, ':false': False}
+    )
 
     # Sort by most recent (based on createdAt)
     topic_dates = {}
-    for post in active_posts:
+    for post in posts:
         topic = post.get('topic')
+        if topic in skip_topics or hidden_by_feed(post, None):
+            continue
         created_at = post.get('createdAt', '')
         if topic and (topic not in topic_dates or created_at > topic_dates[topic]):
             topic_dates[topic] = created_at
 
-    # Sort topics by most recent first
-    sorted_topics = sorted(topics, key=lambda t: topic_dates.get(t, ''), reverse=True)
+    return topic_dates
+
+def iter_user_topics(user_id):
+    """
+    Unique topics for a user (excluding deleted ones), most recent first.
+    Read from the user's feed headers - one small query however many posts they have.
+    Until manage.py backfill_public_feed has run, topics without a header are merged in
+    from the user's posts.
+    """
+    headers = list(iter_query(
+        get_feeds_table(),
+        KeyConditionExpression='userId = :uid',
+        ProjectionExpression='topic, updatedAt, deletedByCreator',
+        ExpressionAttributeValues={':uid': user_id}
+    ))
+
+    topic_dates = {
+        header['topic']: header.get('updatedAt', '')
+        for header in headers if not header.get('deletedByCreator', False)
+    }
+
+    if not feed_headers_backfilled():
+        topic_dates.update(_scan_user_topics(user_id, skip_topics={header['topic'] for header in headers}))
+
+    return iter(sorted(topic_dates, key=lambda t: topic_dates[t], reverse=True))
+
+def get_user_topics(user_id, limit=None, cursor=None):
+    """One page of a user's topics, most recent first: {'topics', 'next_cursor', 'has_more'}"""
+    limit = page_limit(limit, cursor)
+
+    offset = 0
+    if cursor:
+        position = decode_cursor(cursor)
+        if not isinstance(position, dict) or not isinstance(position.get('offset'), int) or position['offset'] < 0:
+            raise ValueError('Invalid cursor')
+        offset = position['offset']
+
+    if limit is None:
+        return {'topics': list(iter_user_topics(user_id)), 'next_cursor': None, 'has_more': False}
+
+    # One extra topic tells us whether another page exists
+    topics = list(itertools.islice(iter_user_topics(user_id), offset, offset + limit + 1))
+    has_more = len(topics) > limit
 
-    return sorted_topics
+    return {
+        'topics': topics[:limit],
+        'next_cursor': encode_cursor({'offset': offset + limit}) if has_more else None,
+        'has_more': has_more
+    }
+
+def _cancellation_reasons(error):
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        raise error
+    return [reason.get('Code') for reason in error.response.get('CancellationReasons', [])]
 
 def like_post(user_id, post_id, post_data):
-    """Like a post"""
+    """
+    Like a post. The like and the +1 on the post's `likes` counter are written in one
+    transaction that only goes through if this user hadn't liked the post yet, so repeated
+    likes never double count. Returns True if the like is new.
+    Likes only reference the post (owner + postId); get_user_likes reads the current post.
+    """
     table = get_likes_table()
 
+    owner_id = (post_data or {}).get('userId')
     item = {
         'userId': user_id,
         'postId': post_id,
-        'post': post_data,  # Store the entire post for easy retrieval
+        'postOwnerId': owner_id,
         'likedAt': datetime.now().isoformat(),
     }
 
-    table.put_item(Item=item)
-    return True
+    if owner_id:
+        try:
+            # The resource's client takes plain python values, like the Table methods
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                {'Put': {
+                    'TableName': table.name,
+                    'Item': item,
+                    'ConditionExpression': 'attribute_not_exists(postId)'
+                }},
+                {'Update': {
+                    'TableName': get_posts_table().name,
+                    'Key': {'userId': owner_id, 'postId': post_id},
+                    'UpdateExpression': 'ADD likes :one',
+                    'ConditionExpression': 'attribute_exists(postId)',
+                    'ExpressionAttributeValues': {':one': 1}
+                }}
+            ])
+            forget_post(owner_id, post_id)
+            return True
+        except ClientError as e:
+            reasons = _cancellation_reasons(e)
+            if reasons[:1] == ['ConditionalCheckFailed']:
+                return False  # Already liked
+            if reasons[1:2] != ['ConditionalCheckFailed']:
+                raise
+            # The post isn't in the posts table - record the like without a counter
+
+    # Nothing to reference, so keep the client's copy of the post
+    item.pop('postOwnerId')
+    item['post'] = post_data
 
-def unlike_post(user_id, post_id):
-    """Unlike a post"""
-    table = get_likes_table()
-
-    table.delete_item(
-        Key={
-            'userId': user_id,
-            'postId': post_id
-        }
+    try:
+        table.put_item(Item=item, ConditionExpression='attribute_not_exists(postId)')
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+def _delete_like(key):
+    """Remove a like without touching any counter; False if there was no like"""
+    try:
+        get_likes_table().delete_item(Key=key, ConditionExpression='attribute_exists(postId)')
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+def _unlike_counted(key, owner_id):
+    """
+    Remove a like saved with postOwnerId = owner_id and take one off that post's counter.
+    Returns None when there's no such like (missing, legacy or another owner), else whether one was removed.
+    """
+    post_id = key['postId']
+    try:
+        # The resource's client takes plain python values, like the Table methods
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Delete': {
+                'TableName': get_likes_table().name,
+                'Key': key,
+                'ConditionExpression': 'postOwnerId = :owner',
+                'ExpressionAttributeValues': {':owner': owner_id}
+            }},
+            {'Update': {
+                'TableName': get_posts_table().name,
+                'Key': {'userId': owner_id, 'postId': post_id},
+                'UpdateExpression': 'ADD likes :minus_one',
+                'ConditionExpression': 'attribute_exists(postId) AND likes > :zero',
+                'ExpressionAttributeValues': {':minus_one': -1, ':zero': 0}
+            }}
+        ])
+        forget_post(owner_id, post_id)
+        return True
+    except ClientError as e:
+        reasons = _cancellation_reasons(e)
+        if reasons[:1] == ['ConditionalCheckFailed']:
+            return None
+        if reasons[1:2] != ['ConditionalCheckFailed']:
+            raise
+        # Post deleted (or its counter already at zero) - just remove the like
+        return _delete_like(key)
+
+def unlike_post(user_id, post_id, owner_id=None):
+    """
+    Unlike a post, taking one off the post's `likes` counter in the same transaction.
+    Only an existing like is removed, so repeated unlikes never double count.
+    Likes saved before counters were kept (no postOwnerId) never added to the counter,
+    so they are removed without touching it. owner_id is only a hint from the client:
+    the counter is decremented for the owner recorded on the like.
+    Returns True if a like was removed.
+    """
+    key = {'userId': user_id, 'postId': post_id}
+
+    if owner_id:
+        removed = _unlike_counted(key, owner_id)
+        if removed is not None:
+            return removed
+
+    like = get_likes_table().get_item(Key=key).get('Item')
+    if like is None:
+        return False
+
+    recorded_owner = like.get('postOwnerId')
+    if recorded_owner and recorded_owner != owner_id:
+        removed = _unlike_counted(key, recorded_owner)
+        if removed is not None:
+            return removed
+
+    return _delete_like(key)
+
+def _like_owner(like):
+    return like.get('postOwnerId') or (like.get('post') or {}).get('userId')
+
+def hydrate_likes(user_id, likes):
+    """
+    The liked posts for a batch of like items, in the same order, read from the posts table
+    so edits, privacy changes and deletions show up. Posts whose feed was deleted, or made
+    private by someone else, are left out. Likes of posts that aren't in the posts table fall
+    back to the copy stored with the like (likes saved before likes became references).
+    """
+    posts = get_posts_by_keys([(_like_owner(like), like['postId']) for like in likes if _like_owner(like)])
+    headers = get_feed_headers((post['userId'], post.get('topic', '')) for post in posts.values())
+
+    liked_posts = []
+    for like in likes:
+        post = posts.get((_like_owner(like), like['postId']))
+        if post is None:
+            if like.get('post'):
+                liked_posts.append(like['post'])
+            continue
+
+        header = headers.get((post['userId'], post.get('topic', '')))
+        if hidden_by_feed(post, header):
+            continue
+        if apply_feed_header(post, header).get('isPrivate', False) and post['userId'] != user_id:
+            continue
+
+        post['likedAt'] = like.get('likedAt')
+        liked_posts.append(post)
+
+    return liked_posts
+
+def iter_user_likes(user_id):
+    """Lazily yield every liked post for a user, hydrated BATCH_GET_SIZE likes at a time"""
+    likes = iter_query(
+        get_likes_table(),
+        KeyConditionExpression='userId = :uid',
+        ExpressionAttributeValues={':uid': user_id}
     )
-    return True
-
-def get_user_likes(user_id):
-    """Get all liked posts for a user"""
-    table = get_likes_table()
-
-    response = table.query(
+    while True:
+        chunk = list(itertools.islice(likes, BATCH_GET_SIZE))
+        if not chunk:
+            return
+        yield from hydrate_likes(user_id, chunk)
+
+def get_user_likes(user_id, limit=None, cursor=None):
+    """
+    One page of liked posts for a user: {'posts', 'next_cursor', 'has_more'}.
+    Posts that are no longer visible are dropped, so a page can hold fewer than `limit`.
+    """
+    page = query_page(
+        get_likes_table(),
+        user_id,
+        limit,
+        cursor,
         KeyConditionExpression='userId = :uid',
         ExpressionAttributeValues={':uid': user_id}
     )
 
-    return [item['post'] for item in response.get('Items', [])]
+    return {
+        'posts': hydrate_likes(user_id, page['items']),
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more']
+    }
 
 def is_post_liked(user_id, post_id):
     """Check if user has liked a post"""
@@ -246,103 +1169,372 @@ def is_post_liked(user_id, post_id):
 
     return 'Item' in response
 
-def get_posts_by_topic(user_id, topic):
-    """Get all posts for a specific topic (excluding deleted ones)"""
-    table = get_posts_table()
+def get_liked_post_ids(user_id, post_ids):
+    """Which of these postIds the user has liked, with BatchGetItem instead of a get_item per post"""
+    keys = [{'userId': user_id, 'postId': post_id} for post_id in set(post_ids) if post_id]
+    likes = batch_get_items(get_likes_table().name, keys, projection='postId')
+    return {like['postId'] for like in likes}
 
-    response = table.query(
-        KeyConditionExpression='userId = :uid',
-        FilterExpression='topic = :topic AND (attribute_not_exists(deletedByCreator) OR deletedByCreator = :false)',
-        ExpressionAttributeValues={
+def annotate_liked(user_id, posts):
+    """Copies of the posts with a `liked` flag for this user (one batched lookup for the page)"""
+    liked_ids = get_liked_post_ids(user_id, [post.get('postId') for post in posts])
+    return [dict(post, liked=post.get('postId') in liked_ids) for post in posts]
+
+def _topic_query(user_id, topic):
+    # The key condition only reads this topic's range of the partition; the topic filter
+    # drops posts of other topics sharing the prefix (e.g. 'ai' and 'ai_ethics')
+    return {
+        'KeyConditionExpression': 'userId = :uid AND begins_with(postId, :prefix)',
+        'FilterExpression': f'topic = :topic AND ({ACTIVE_POST_FILTER})',
+        'ExpressionAttributeValues': {
             ':uid': user_id,
+            ':prefix': topic_key_prefix(topic),
             ':topic': topic,
             ':false': False
         }
+    }
+
+def iter_posts_by_topic(user_id, topic):
+    """Lazily yield every post for a specific topic (excluding deleted ones)"""
+    header = get_feed_header(user_id, topic)
+    for post in iter_query(get_posts_table(), **_topic_query(user_id, topic)):
+        if not hidden_by_feed(post, header):
+            yield apply_feed_header(post, header)
+
+def get_posts_by_topic(user_id, topic, limit=None, cursor=None):
+    """One page of posts for a specific topic (excluding deleted ones): {'posts', 'next_cursor', 'has_more'}"""
+    header = get_feed_header(user_id, topic)
+    page = query_page(
+        get_posts_table(),
+        user_id,
+        limit,
+        cursor,
+        keep=lambda post: not hidden_by_feed(post, header),
+        sort_prefix=topic_key_prefix(topic),
+        **_topic_query(user_id, topic)
     )
 
-    return response.get('Items', [])
+    return {
+        'posts': [apply_feed_header(post, header) for post in page['items']],
+        'next_cursor': page['next_cursor'],
+        'has_more': page['has_more']
+    }
 
-def delete_feed(user_id, topic):
-    """Mark posts as deleted by creator (soft delete - stays in DB for others to see)"""
+def _count_topic_posts(user_id, topic):
+    """Number of posts in a topic not flagged deleted on the post itself (feeds saved before headers existed)"""
+    query_kwargs = dict(_topic_query(user_id, topic), Select='COUNT')
+    count = 0
+    while True:
+        response = get_posts_table().query(**query_kwargs)
+        count += response['Count']
+        if 'LastEvaluatedKey' not in response:
+            return count
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def _adopt_legacy_feed(user_id, topic):
+    """
+    One-time migration for a feed saved before feed headers existed: index its posts in the
+    public-feed GSI and record the post count on the header. Later toggles are a single write.
+    """
     table = get_posts_table()
 
-    # First, get all posts for this topic
-    posts = get_posts_by_topic(user_id, topic)
+    created = []
+    username = user_id[:8]
+    for post in iter_query(table, **_topic_query(user_id, topic)):
+        if 'publicShard' not in post:
+            table.update_item(
+                Key={'userId': user_id, 'postId': post['postId']},
+                UpdateExpression='SET publicShard = :shard',
+                ExpressionAttributeValues={':shard': public_shard_for(post['postId'])}
+            )
+        created.append(post.get('createdAt', ''))
+        username = post.get('username', username)
+
+    now = datetime.now().isoformat()
+    response = get_feeds_table().update_item(
+        Key={'userId': user_id, 'topic': topic},
+        UpdateExpression=(
+            'SET postCount = if_not_exists(postCount, :count), createdAt = if_not_exists(createdAt, :first), '
+            'updatedAt = if_not_exists(updatedAt, :last), username = if_not_exists(username, :username)'
+        ),
+        ExpressionAttributeValues={
+            ':count': len(created),
+            ':first': min(created, default=now),
+            ':last': max(created, default=now),
+            ':username': username
+        },
+        ReturnValues='ALL_NEW'
+    )
+    return response['Attributes']
 
-    # Mark each post as deleted by creator (soft delete)
-    deleted_count = 0
-    for post in posts:
-        table.update_item(
-            Key={
-                'userId': user_id,
-                'postId': post['postId']
-            },
-            UpdateExpression='SET deletedByCreator = :true',
-            ExpressionAttributeValues={
-                ':true': True
-            }
-        )
-        deleted_count += 1
+def delete_feed(user_id, topic):
+    """
+    Mark a feed as deleted by its creator (soft delete - posts stay in DB, e.g. for likes).
+    A single write to the feed header: every post created up to deletedAt is hidden.
+    """
+    response = get_feeds_table().update_item(
+        Key={'userId': user_id, 'topic': topic},
+        UpdateExpression='SET deletedByCreator = :true, deletedAt = :now, postCount = :zero',
+        ExpressionAttributeValues={
+            ':true': True,
+            ':now': datetime.now().isoformat(),
+            ':zero': 0
+        },
+        ReturnValues='ALL_OLD'
+    )
+    previous = response.get('Attributes')
+
+    if previous is None or 'postCount' not in previous:
+        # Feed saved before headers existed - count what was just hidden
+        deleted_count = _count_topic_posts(user_id, topic)
+    else:
+        deleted_count = int(previous['postCount'])
+
+    _expire_public_snapshot()
 
     return {
         'deleted_count': deleted_count,
         'topic': topic
     }
 
+def _set_feed_privacy(user_id, topic, is_private):
+    """Set isPrivate on an existing header; None if the feed has no header"""
+    try:
+        response = get_feeds_table().update_item(
+            Key={'userId': user_id, 'topic': topic},
+            UpdateExpression='SET isPrivate = :private',
+            ConditionExpression='attribute_exists(userId)',
+            ExpressionAttributeValues={':private': is_private},
+            ReturnValues='ALL_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return None
+    return response['Attributes']
+
 def update_feed_privacy(user_id, topic, is_private):
-    """Update privacy setting for all posts in a topic"""
+    """
+    Update privacy for a whole feed - a single write to its header, however many posts it has.
+    Returns None (nothing written) if the user has no feed with this topic.
+    """
+    header = _set_feed_privacy(user_id, topic, is_private)
+
+    if header is None:
+        # No header: either a feed saved before headers existed, or no such feed at all
+        if _count_topic_posts(user_id, topic) == 0:
+            return None
+        _adopt_legacy_feed(user_id, topic)
+        header = _set_feed_privacy(user_id, topic, is_private)
+    elif 'postCount' not in header:
+        header = _adopt_legacy_feed(user_id, topic)
+
+    _expire_public_snapshot()
+
+    return {
+        'updated_count': int(header.get('postCount', 0)),
+        'topic': topic,
+        'isPrivate': is_private
+    }
+
+
+def ensure_public_feed_index():
+    """Add the public-feed GSI to an existing posts table (tables created before it existed)"""
+    get_posts_table()
+    return PUBLIC_FEED_INDEX in ensure_table_indexes(POSTS_TABLE, wait=False)
+
+
+def backfill_public_feed_index():
+    """Set publicShard on existing non-deleted posts so they appear in the index (headers decide visibility)"""
     table = get_posts_table()
 
-    # Get all posts for this topic
-    posts = get_posts_by_topic(user_id, topic)
+    scan_kwargs = {
+        'FilterExpression': f'attribute_not_exists(publicShard) AND ({ACTIVE_POST_FILTER})',
+        'ExpressionAttributeValues': {':false': False},
+        'ProjectionExpression': 'userId, postId'
+    }
 
-    # Update each post
     updated_count = 0
-    for post in posts:
-        table.update_item(
-            Key={
-                'userId': user_id,
-                'postId': post['postId']
-            },
-            UpdateExpression='SET isPrivate = :private',
+    while True:
+        response = table.scan(**scan_kwargs)
+        for post in response.get('Items', []):
+            table.update_item(
+                Key={'userId': post['userId'], 'postId': post['postId']},
+                UpdateExpression='SET publicShard = :shard',
+                ExpressionAttributeValues={':shard': public_shard_for(post['postId'])}
+            )
+            updated_count += 1
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return updated_count
+
+
+def backfill_feed_headers():
+    """
+    Create the missing feed headers for posts saved before feed headers existed.
+    A feed's privacy comes from its newest post; it counts as deleted when all its posts are.
+    Existing header attributes are left alone.
+    """
+    table = get_posts_table()
+
+    scan_kwargs = {
+        'ProjectionExpression': 'userId, topic, createdAt, username, isPrivate, deletedByCreator'
+    }
+
+    feeds = {}
+    while True:
+        response = table.scan(**scan_kwargs)
+        for post in response.get('Items', []):
+            if not post.get('topic'):
+                continue
+            created_at = post.get('createdAt', '')
+            feed = feeds.setdefault((post['userId'], post['topic']), {
+                'first': created_at,
+                'last': '',
+                'isPrivate': False,
+                'username': post.get('username', post['userId'][:8]),
+                'count': 0
+            })
+            feed['first'] = min(feed['first'], created_at)
+            if created_at >= feed['last']:
+                feed['last'] = created_at
+                feed['isPrivate'] = post.get('isPrivate', False)
+            if not post.get('deletedByCreator', False):
+                feed['count'] += 1
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    feeds_table = get_feeds_table()
+    for (user_id, topic), feed in feeds.items():
+        feeds_table.update_item(
+            Key={'userId': user_id, 'topic': topic},
+            UpdateExpression=(
+                'SET isPrivate = if_not_exists(isPrivate, :private), '
+                'deletedByCreator = if_not_exists(deletedByCreator, :deleted), '
+                'postCount = if_not_exists(postCount, :count), username = if_not_exists(username, :username), '
+                'createdAt = if_not_exists(createdAt, :first), updatedAt = if_not_exists(updatedAt, :last)'
+            ),
             ExpressionAttributeValues={
-                ':private': is_private
+                ':private': feed['isPrivate'],
+                ':deleted': feed['count'] == 0,
+                ':count': feed['count'],
+                ':username': feed['username'],
+                ':first': feed['first'],
+                ':last': feed['last']
             }
         )
-        updated_count += 1
 
-    return {
-        'updated_count': updated_count,
-        'topic': topic,
-        'isPrivate': is_private
+    # Every feed has a header now, so topic listings can stop scanning posts
+    feeds_table.put_item(Item=dict(FEED_HEADERS_BACKFILL_MARKER, completedAt=datetime.now().isoformat()))
+
+    return len(feeds)
+
+
+def migrate_post_keys(dry_run=False):
+    """
+    Re-key posts whose postId doesn't start with their topic (rows written outside save_posts),
+    so topic queries find them. Each post is copied to '{topic}_{old postId}' and the old row
+    deleted; likes pointing at the old postId are moved too.
+    Returns (posts re-keyed, likes moved).
+    """
+    posts_table = get_posts_table()
+
+    renamed = {}
+    scan_kwargs = {}
+    while True:
+        response = posts_table.scan(**scan_kwargs)
+        for post in response.get('Items', []):
+            topic = post.get('topic')
+            if not topic or post['postId'].startswith(topic_key_prefix(topic)):
+                continue
+
+            new_post_id = f"{topic_key_prefix(topic)}{post['postId']}"
+            renamed[(post['userId'], post['postId'])] = new_post_id
+            if dry_run:
+                continue
+
+            new_post = dict(post, postId=new_post_id)
+            if 'publicShard' in post:
+                new_post['publicShard'] = public_shard_for(new_post_id)
+            posts_table.put_item(Item=new_post)
+            posts_table.delete_item(Key={'userId': post['userId'], 'postId': post['postId']})
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    if not renamed:
+        return 0, 0
+
+    # Likes are keyed by the liker, so find the ones pointing at a renamed post with a scan
+    new_ids = {post_id: new_post_id for (_, post_id), new_post_id in renamed.items()}
+    likes_table = get_likes_table()
+    moved_likes = 0
+    scan_kwargs = {}
+    while True:
+        response = likes_table.scan(**scan_kwargs)
+        for like in response.get('Items', []):
+            new_post_id = new_ids.get(like['postId'])
+            if new_post_id is None:
+                continue
+            moved_likes += 1
+            if dry_run:
+                continue
+
+            new_like = dict(like, postId=new_post_id)
+            if (like.get('post') or {}).get('postId') == like['postId']:
+                new_like['post'] = dict(like['post'], postId=new_post_id)
+            likes_table.put_item(Item=new_like)
+            likes_table.delete_item(Key={'userId': like['userId'], 'postId': like['postId']})
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return len(renamed), moved_likes
+
+
+def normalize_like_items(dry_run=False):
+    """
+    Turn likes that still carry a full copy of the post into references (postOwnerId only),
+    when the post is still in the posts table. Returns the number of likes converted.
+    """
+    likes_table = get_likes_table()
+
+    converted = 0
+    scan_kwargs = {
+        'FilterExpression': 'attribute_exists(#post)',
+        'ProjectionExpression': 'userId, postId, postOwnerId, #post.userId',
+        'ExpressionAttributeNames': {'#post': 'post'}
     }
+    while True:
+        response = likes_table.scan(**scan_kwargs)
+        likes = [like for like in response.get('Items', []) if _like_owner(like)]
+        existing = get_posts_by_keys([(_like_owner(like), like['postId']) for like in likes])
+
+        for like in likes:
+            if (_like_owner(like), like['postId']) not in existing:
+                continue
+            converted += 1
+            if dry_run:
+                continue
+            likes_table.update_item(
+                Key={'userId': like['userId'], 'postId': like['postId']},
+                UpdateExpression='SET postOwnerId = :owner REMOVE #post',
+                ExpressionAttributeNames={'#post': 'post'},
+                ExpressionAttributeValues={':owner': _like_owner(like)}
+            )
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return converted
 
 
 def get_flashcards_table():
-    """Get or create flashcards table"""
-    try:
-        table = dynamodb.Table(FLASHCARDS_TABLE)
-        table.load()
-        return table
-    except:
-        # Table doesn't exist, create it
-        table = dynamodb.create_table(
-            TableName=FLASHCARDS_TABLE,
-            KeySchema=[
-                {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
-                {'AttributeName': 'flashcardId', 'KeyType': 'RANGE'}  # Sort key
-            ],
-            AttributeDefinitions=[
-                {'AttributeName': 'userId', 'AttributeType': 'S'},
-                {'AttributeName': 'flashcardId', 'AttributeType': 'S'},
-            ],
-            ProvisionedThroughput={
-                'ReadCapacityUnits': 5,
-                'WriteCapacityUnits': 5
-            }
-        )
-        table.wait_until_exists()
-        return table
+    """Flashcards table (cached handle, see get_table)"""
+    return get_table(FLASHCARDS_TABLE)
 
 
 def save_flashcard_set(user_id, title, flashcards_data, image_url=None):
@@ -369,12 +1561,17 @@ def save_flashcard_set(user_id, title, flashcards_data, image_url=None):
         raise e
 
 
-def get_user_flashcards(user_id):
-    """Get all flashcard sets for a user"""
+def get_user_flashcards(user_id, limit=None, cursor=None):
+    """One page of flashcard sets for a user: {'flashcards', 'next_cursor', 'has_more'}"""
     try:
         table = get_flashcards_table()
         
-        response = table.query(
+        page = query_page(
+            table,
+            user_id,
+            limit,
+            cursor,
+            sort_key='flashcardId',
             KeyConditionExpression='userId = :userId',
             ExpressionAttributeValues={
                 ':userId': user_id
@@ -383,7 +1580,7 @@ def get_user_flashcards(user_id):
         )
         
         flashcards = []
-        for item in response.get('Items', []):
+        for item in page['items']:
             flashcard = {
                 'id': item['flashcardId'],
                 'title': item['title'],
@@ -393,7 +1590,11 @@ def get_user_flashcards(user_id):
             }
             flashcards.append(flashcard)
         
-        return flashcards
+        return {
+            'flashcards': flashcards,
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more']
+        }
         
     except Exception as e:
         print(f"Error getting user flashcards: {str(e)}")
@@ -401,7 +1602,14 @@ def get_user_flashcards(user_id):
 
 
 def get_flashcard_by_id(user_id, flashcard_id):
-    """Get specific flashcard set by ID"""
+    """Get specific flashcard set by ID (read-through study-set cache)"""
+    return get_cached_study_set(
+        'flashcards', user_id, flashcard_id,
+        lambda: _load_flashcard_set(user_id, flashcard_id)
+    )
+
+
+def _load_flashcard_set(user_id, flashcard_id):
     try:
         table = get_flashcards_table()
         
@@ -440,6 +1648,7 @@ def delete_flashcard_set(user_id, flashcard_id):
                 'flashcardId': flashcard_id
             }
         )
+        invalidate_study_set('flashcards', user_id, flashcard_id)
         
         return {'deleted': True, 'flashcardId': flashcard_id}
         
@@ -449,30 +1658,8 @@ def delete_flashcard_set(user_id, flashcard_id):
 
 
 def get_quizzes_table():
-    """Get or create quizzes table"""
-    try:
-        table = dynamodb.Table(QUIZZES_TABLE)
-        table.load()
-        return table
-    except:
-        # Table doesn't exist, create it
-        table = dynamodb.create_table(
-            TableName=QUIZZES_TABLE,
-            KeySchema=[
-                {'AttributeName': 'userId', 'KeyType': 'HASH'},  # Partition key
-                {'AttributeName': 'quizId', 'KeyType': 'RANGE'}  # Sort key
-            ],
-            AttributeDefinitions=[
-                {'AttributeName': 'userId', 'AttributeType': 'S'},
-                {'AttributeName': 'quizId', 'AttributeType': 'S'},
-            ],
-            ProvisionedThroughput={
-                'ReadCapacityUnits': 5,
-                'WriteCapacityUnits': 5
-            }
-        )
-        table.wait_until_exists()
-        return table
+    """Quizzes table (cached handle, see get_table)"""
+    return get_table(QUIZZES_TABLE)
 
 
 def save_quiz_set(user_id, title, questions_data, image_url=None):
@@ -503,12 +1690,17 @@ def save_quiz_set(user_id, title, questions_data, image_url=None):
         raise e
 
 
-def get_user_quizzes(user_id):
-    """Get all quiz sets for a user"""
+def get_user_quizzes(user_id, limit=None, cursor=None):
+    """One page of quiz sets for a user: {'quizzes', 'next_cursor', 'has_more'}"""
     try:
         table = get_quizzes_table()
         
-        response = table.query(
+        page = query_page(
+            table,
+            user_id,
+            limit,
+            cursor,
+            sort_key='quizId',
             KeyConditionExpression='userId = :userId',
             ExpressionAttributeValues={
                 ':userId': user_id
@@ -517,7 +1709,7 @@ def get_user_quizzes(user_id):
         )
         
         quizzes = []
-        for item in response.get('Items', []):
+        for item in page['items']:
             quiz = {
                 'id': item['quizId'],
                 'title': item['title'],
@@ -530,7 +1722,11 @@ def get_user_quizzes(user_id):
             }
             quizzes.append(quiz)
         
-        return quizzes
+        return {
+            'quizzes': quizzes,
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more']
+        }
         
     except Exception as e:
         print(f"Error getting user quizzes: {str(e)}")
@@ -538,7 +1734,14 @@ def get_user_quizzes(user_id):
 
 
 def get_quiz_by_id(user_id, quiz_id):
-    """Get specific quiz set by ID"""
+    """Get specific quiz set by ID (read-through study-set cache)"""
+    return get_cached_study_set(
+        'quizzes', user_id, quiz_id,
+        lambda: _load_quiz_set(user_id, quiz_id)
+    )
+
+
+def _load_quiz_set(user_id, quiz_id):
     try:
         table = get_quizzes_table()
         
@@ -588,6 +1791,7 @@ def submit_quiz_score(user_id, quiz_id, user_answers, score):
                 ':updated': datetime.utcnow().isoformat()
             }
         )
+        invalidate_study_set('quizzes', user_id, quiz_id)
         
         return {'submitted': True, 'quizId': quiz_id, 'score': score}
         
@@ -607,6 +1811,7 @@ def delete_quiz_set(user_id, quiz_id):
                 'quizId': quiz_id
             }
         )
+        invalidate_study_set('quizzes', user_id, quiz_id)
         
         return {'deleted': True, 'quizId': quiz_id}
         
@@ -0,0 +1,114 @@
+import os
+import re
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .cache_counters import CacheCounters
+from .models import CachedFeed
+
+# Generated feeds are reused for this long before a topic is regenerated
+FEED_CACHE_TTL_SECONDS = int(os.getenv('FEED_CACHE_TTL_SECONDS', str(6 * 60 * 60)))
+# Least recently used topics are evicted past this many cached feeds
+FEED_CACHE_MAX_ENTRIES = int(os.getenv('FEED_CACHE_MAX_ENTRIES', '500'))
+
+FEED_CACHE_ENDPOINT = 'generateFeed'
+
+_counters = CacheCounters('stores', 'evictions', 'errors')
+
+
+def normalize_topic(topic):
+    """Normalize a topic so "Neural  Networks " and "neural networks" share a cache entry"""
+    return re.sub(r'\s+', ' ', str(topic)).strip().lower()
+
+
+def get_cached_feed(topic):
+    """
+    Return the cached posts for a topic, or None on a miss or expired entry.
+    The cache is optional: a database error is logged and treated as a miss.
+    """
+    cache_key = normalize_topic(topic)
+    expires_before = timezone.now() - timedelta(seconds=FEED_CACHE_TTL_SECONDS)
+
+    try:
+        entry = CachedFeed.objects.filter(
+            endpoint=FEED_CACHE_ENDPOINT,
+            cache_key=cache_key,
+            created_at__gte=expires_before
+        ).first()
+    except DatabaseError as e:
+        print(f"⚠️ Feed cache lookup failed for '{cache_key}': {e}")
+        _counters.count('errors')
+        entry = None
+
+    if entry is None:
+        _counters.count('misses')
+        return None
+
+    # Bump hits and last_accessed_at (used for LRU eviction) without re-saving the data;
+    # skipped if the database is busy
+    try:
+        CachedFeed.objects.filter(pk=entry.pk).update(
+            hits=F('hits') + 1,
+            last_accessed_at=timezone.now()
+        )
+    except DatabaseError:
+        _counters.count('errors')
+    _counters.count('hits')
+    print(f"✓ Feed cache hit: {cache_key}")
+    return entry.data.get('posts', [])
+
+
+def store_cached_feed(topic, posts):
+    """
+    Cache a freshly generated feed and evict least recently used topics past the size limit.
+    Database errors are logged and the store skipped.
+    """
+    if not posts:
+        return
+
+    cache_key = normalize_topic(topic)
+
+    # Best effort: a busy database must not fail a request whose feed is already generated
+    try:
+        # update_or_create leaves created_at alone, so reset it to restart the TTL
+        CachedFeed.objects.update_or_create(
+            endpoint=FEED_CACHE_ENDPOINT,
+            cache_key=cache_key,
+            defaults={'data': {'topic': topic, 'posts': posts}, 'hits': 0, 'created_at': timezone.now()}
+        )
+        _counters.count('stores')
+
+        evict_feed_cache()
+    except DatabaseError as e:
+        print(f"⚠️ Feed cache store skipped for '{cache_key}': {e}")
+        _counters.count('errors')
+
+
+def evict_feed_cache():
+    """Drop expired feeds, then the least recently used ones beyond FEED_CACHE_MAX_ENTRIES"""
+    entries = CachedFeed.objects.filter(endpoint=FEED_CACHE_ENDPOINT)
+
+    expires_before = timezone.now() - timedelta(seconds=FEED_CACHE_TTL_SECONDS)
+    evicted, _ = entries.filter(created_at__lt=expires_before).delete()
+
+    stale_ids = list(
+        entries.order_by('-last_accessed_at').values_list('pk', flat=True)[FEED_CACHE_MAX_ENTRIES:]
+    )
+    if stale_ids:
+        deleted, _ = CachedFeed.objects.filter(pk__in=stale_ids).delete()
+        evicted += deleted
+
+    if evicted:
+        _counters.count('evictions', evicted)
+
+
+def get_feed_cache_stats():
+    """Hit/miss counters for this process plus the current number of cached feeds"""
+    stats = _counters.stats()
+    stats['entries'] = CachedFeed.objects.filter(endpoint=FEED_CACHE_ENDPOINT).count()
+    stats['max_entries'] = FEED_CACHE_MAX_ENTRIES
+    stats['ttl_seconds'] = FEED_CACHE_TTL_SECONDS
+    return stats
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .feed_service import get_or_generate_feed
+from .models import FeedJob
+
+# Background workers running whole feed generations (each one fans out on the feed pool)
+FEED_JOB_WORKERS = int(os.getenv('FEED_JOB_WORKERS', '4'))
+# Max jobs queued or running at once in this process; further submissions are rejected
+FEED_JOB_MAX_QUEUE = int(os.getenv('FEED_JOB_MAX_QUEUE', '32'))
+# Finished jobs are kept this long for clients to fetch the result
+FEED_JOB_RESULT_TTL_SECONDS = int(os.getenv('FEED_JOB_RESULT_TTL_SECONDS', '3600'))
+# Attempts for the final status write, which must land even when the database is busy
+FEED_JOB_STATUS_WRITE_ATTEMPTS = 5
+
+job_executor = ThreadPoolExecutor(
+    max_workers=FEED_JOB_WORKERS,
+    thread_name_prefix='feed-job'
+)
+
+# Job state lives in the FeedJob table so polls can land on any worker process;
+# only the queue-depth count is per process (it guards this process's executor)
+_active_lock = threading.Lock()
+_active_jobs = set()
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobQueueFull(Exception):
+    """Raised when FEED_JOB_MAX_QUEUE jobs are already queued or running"""
+
+
+def _update_job(job_id, attempts=1, **fields):
+    """Write job fields; progress updates are best effort, final statuses are retried"""
+    for attempt in range(attempts):
+        try:
+            FeedJob.objects.filter(job_id=job_id).update(**fields)
+            return True
+        except DatabaseError as e:
+            if attempt == attempts - 1:
+                print(f"⚠️ Could not update feed job {job_id}: {e}")
+                return False
+            time.sleep(0.1 * (2 ** attempt))
+
+
+def _prune_jobs():
+    """Forget finished jobs older than FEED_JOB_RESULT_TTL_SECONDS"""
+    cutoff = timezone.now() - timedelta(seconds=FEED_JOB_RESULT_TTL_SECONDS)
+    try:
+        FeedJob.objects.exclude(status__in=ACTIVE_STATUSES).filter(finished_at__lt=cutoff).delete()
+    except DatabaseError as e:
+        print(f"⚠️ Could not prune feed jobs: {e}")
+
+
+def _run_feed_job(job_id, topic, batch_captions, use_cache):
+    """Worker body: generate (or load from cache) the feed and record the result on the job"""
+    close_old_connections()
+    _update_job(job_id, status='running', started_at=timezone.now())
+
+    def progress(completed, total):
+        _update_job(job_id, progress={'completed': completed, 'total': total})
+
+    try:
+        feed = get_or_generate_feed(
+            topic,
+            batch_captions=batch_captions,
+            use_cache=use_cache,
+            progress=progress
+        )
+        posts = feed['posts']
+
+        _update_job(
+            job_id,
+            attempts=FEED_JOB_STATUS_WRITE_ATTEMPTS,
+            status='succeeded',
+            result={'topic': topic, **feed},
+            finished_at=timezone.now()
+        )
+        print(f"✓ Feed job {job_id} finished: {len(posts)} posts for '{topic}'")
+
+    except Exception as e:
+        import traceback
+        print(f"❌ Feed job {job_id} failed: {str(e)}")
+        print(traceback.format_exc())
+        _update_job(
+            job_id,
+            attempts=FEED_JOB_STATUS_WRITE_ATTEMPTS,
+            status='failed',
+            error=str(e),
+            finished_at=timezone.now()
+        )
+
+    finally:
+        with _active_lock:
+            _active_jobs.discard(job_id)
+        close_old_connections()
+
+
+def submit_feed_job(topic, batch_captions=None, use_cache=True):
+    """
+    Queue a feed generation and return its job id immediately.
+    Raises JobQueueFull when the queue-depth limit is reached.
+    """
+    _prune_jobs()
+
+    job_id = uuid.uuid4().hex
+
+    with _active_lock:
+        if len(_active_jobs) >= FEED_JOB_MAX_QUEUE:
+            raise JobQueueFull(f"{len(_active_jobs)} feed jobs already in progress")
+        _active_jobs.add(job_id)
+
+    try:
+        FeedJob.objects.create(
+            job_id=job_id,
+            topic=topic,
+            status='queued',
+            progress={'completed': 0, 'total': None}
+        )
+    except Exception:
+        with _active_lock:
+            _active_jobs.discard(job_id)
+        raise
+
+    job_executor.submit(_run_feed_job, job_id, topic, batch_captions, use_cache)
+    return job_id
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def get_feed_job(job_id):
+    """Snapshot of a job's status, progress and (once finished) result, or None if unknown"""
+    _prune_jobs()
+
+    job = FeedJob.objects.filter(job_id=job_id).first()
+    if job is None:
+        return None
+
+    return {
+        'jobId': job.job_id,
+        'topic': job.topic,
+        'status': job.status,
+        'progress': job.progress,
+        'result': job.result,
+        'error': job.error,
+        'createdAt': _isoformat(job.created_at),
+        'startedAt': _isoformat(job.started_at),
+        'finishedAt': _isoformat(job.finished_at),
+    }
@@ -0,0 +1,401 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.db import close_old_connections
+
+from .aws_clients import get_client
+from .s3_service import upload_image_from_url
+from .image_search import search_image
+from .deadline import Deadline, DeadlineExceeded
+from .feed_cache import normalize_topic, get_cached_feed, store_cached_feed
+from .singleflight import SingleFlight
+
+bedrock_runtime = get_client('bedrock-runtime')
+
+FEED_MODEL_ID = 'meta.llama3-70b-instruct-v1:0'
+FEED_POST_COUNT = 8
+
+# Worker pool shared by every feed request (image search -> S3 upload -> caption per post)
+FEED_WORKER_POOL_SIZE = int(os.getenv('FEED_WORKER_POOL_SIZE', '16'))
+# Max posts a single request may have in flight, so one feed can't take over the whole pool
+FEED_MAX_CONCURRENCY = int(os.getenv('FEED_MAX_CONCURRENCY', '8'))
+# Caption every post with one model call instead of one call per post
+FEED_BATCH_CAPTIONS = os.getenv('FEED_BATCH_CAPTIONS', 'True') == 'True'
+# Posts aren't started with less than this much of a request's deadline left
+FEED_MIN_POST_SECONDS = float(os.getenv('FEED_MIN_POST_SECONDS', '2'))
+# Shortest deadline a request may ask for: the image-query call plus room to start posts
+FEED_MIN_DEADLINE_SECONDS = max(
+    float(os.getenv('FEED_MIN_DEADLINE_SECONDS', '5')),
+    FEED_MIN_POST_SECONDS
+)
+# Longest deadline a request may ask for (and always a finite number for the pool waits)
+FEED_MAX_DEADLINE_SECONDS = max(
+    float(os.getenv('FEED_MAX_DEADLINE_SECONDS', '60')),
+    FEED_MIN_DEADLINE_SECONDS
+)
+
+feed_executor = ThreadPoolExecutor(
+    max_workers=FEED_WORKER_POOL_SIZE,
+    thread_name_prefix='feed-post'
+)
+
+# Concurrent requests for the same (normalized) topic share one generation
+feed_flight = SingleFlight('generateFeed')
+
+
+def invoke_llama(prompt, max_gen_len):
+    """Run a single Llama 3 completion on Bedrock and return the generated text"""
+    request_body = {
+        "prompt": prompt,
+        "max_gen_len": max_gen_len,
+        "temperature": 0.7,
+        "top_p": 0.9
+    }
+
+    response = bedrock_runtime.invoke_model(
+        modelId=FEED_MODEL_ID,
+        body=json.dumps(request_body)
+    )
+
+    response_body = json.loads(response['body'].read())
+    return response_body['generation']
+
+
+def generate_image_queries(topic):
+    """Ask the LLM for FEED_POST_COUNT image search queries about a topic"""
+    image_query_prompt = f"""Generate 8 image search queries for "{topic}".
+Each query should find an educational image about this topic.
+
+Return ONLY a JSON array with 8 strings.
+
+Example for "neural networks":
+["neural network diagram", "artificial neuron structure", "deep learning layers", "brain neurons microscope", "AI neural pathways", "convolutional neural network", "recurrent neural network", "neural network training process"]
+
+JSON array:"""
+
+    content_text = invoke_llama(image_query_prompt, 512)
+
+    # Extract JSON array of image queries
+    try:
+        image_queries = json.loads(content_text.strip())
+    except json.JSONDecodeError:
+        start = content_text.find('[')
+        end = content_text.rfind(']') + 1
+        if start != -1 and end != 0:
+            image_queries = json.loads(content_text[start:end])
+        else:
+            raise ValueError("Could not parse image queries")
+
+    return image_queries[:FEED_POST_COUNT]  # Take first 8
+
+
+def generate_caption(topic, query):
+    """Generate an Instagram-style caption for one image"""
+    # Using Claude 3.5 Sonnet with vision (via Bedrock)
+    caption_prompt = f"""You are viewing an educational image about "{topic}".
+The image shows: {query}
+
+Write a short, engaging Instagram-style caption (2-3 sentences) that:
+1. Describes what's in the image
+2. Teaches something interesting about "{topic}"
+3. Is fun and easy to understand
+
+Caption:"""
+
+    # Note: For true vision, we'd send the image. For now, using query as context
+    # To use actual vision, switch to anthropic.claude-3-5-sonnet-20241022-v2:0 with image
+    return invoke_llama(caption_prompt, 256).strip()
+
+
+def generate_captions_batch(topic, image_queries):
+    """
+    Caption all posts with a single model call.
+    Returns {query: caption} for every entry the model answered properly;
+    missing or malformed entries are left out so the caller can fall back.
+    """
+    numbered_queries = "\n".join(
+        f'{i + 1}. {query}' for i, query in enumerate(image_queries)
+    )
+
+    caption_prompt = f"""You are writing captions for educational images about "{topic}".
+The images show:
+{numbered_queries}
+
+For EACH image write a short, engaging Instagram-style caption (2-3 sentences) that:
+1. Describes what's in the image
+2. Teaches something interesting about "{topic}"
+3. Is fun and easy to understand
+
+Return ONLY a JSON object mapping each image number to its caption.
+
+Example:
+{{"1": "Caption for image 1", "2": "Caption for image 2"}}
+
+JSON object:"""
+
+    # Llama 3 on Bedrock caps max_gen_len at 2048
+    content_text = invoke_llama(caption_prompt, min(256 * len(image_queries), 2048))
+
+    try:
+        caption_map = json.loads(content_text.strip())
+    except json.JSONDecodeError:
+        start = content_text.find('{')
+        end = content_text.rfind('}') + 1
+        if start == -1 or end == 0:
+            raise ValueError("Could not parse batched captions")
+        caption_map = json.loads(content_text[start:end])
+
+    if not isinstance(caption_map, dict):
+        raise ValueError("Batched captions are not a JSON object")
+
+    captions = {}
+    for i, query in enumerate(image_queries):
+        caption = caption_map.get(str(i + 1))
+        if isinstance(caption, str) and caption.strip():
+            captions[query] = caption.strip()
+
+    return captions
+
+
+def resolve_caption(topic, query, batch_captions=None, deadline=None):
+    """Use the batched caption for a query if there is one, else make a per-post call"""
+    if batch_captions is not None:
+        try:
+            caption_text = batch_captions.result(timeout=deadline.remaining() if deadline else None).get(query)
+        except Exception as e:
+            print(f"Batched caption error: {e}")
+            caption_text = None
+
+        if caption_text:
+            return caption_text
+
+        print(f"⚠️ No batched caption for: {query}, falling back to single call")
+
+    if deadline:
+        deadline.check("caption")
+    return generate_caption(topic, query)
+
+
+def build_post(topic, query, batch_captions=None, deadline=None):
+    """
+    Build one feed post: image search -> S3 upload -> caption.
+    batch_captions is an optional future holding the batched {query: caption} map.
+    Returns None if no image could be found for the query; raises DeadlineExceeded
+    once the request's deadline has passed so abandoned posts stop early.
+    """
+    # Runs on a feed-post thread, which keeps its own DB connection (image search cache)
+    close_old_connections()
+    try:
+        return _build_post(topic, query, batch_captions, deadline)
+    finally:
+        close_old_connections()
+
+
+def _build_post(topic, query, batch_captions=None, deadline=None):
+    source_image_url = search_image(query, deadline)
+
+    if not source_image_url:
+        print(f"⚠️ No image found for: {query}, skipping")
+        return None
+
+    # Upload to S3
+    if deadline:
+        deadline.check("S3 upload")
+    s3_url = upload_image_from_url(source_image_url, query, timeout=deadline.timeout(10) if deadline else 10)
+    image_url = s3_url if s3_url else source_image_url
+
+    caption_text = resolve_caption(topic, query, batch_captions, deadline)
+
+    print(f"✓ Generated caption for: {query}")
+
+    return {
+        'text': caption_text,
+        'imageQuery': query,
+        'imageUrl': image_url,
+        'musicUrl': "https://example.com/music/default.mp3",
+        'musicTitle': "Background Music"
+    }
+
+
+def iter_feed_posts(topic, image_queries, max_concurrency=None, batch_captions=None, deadline=None, failures=None):
+    """
+    Build posts concurrently on the shared feed pool.
+    Yields (index, post) in completion order; post is None when a query was skipped.
+    At most max_concurrency posts of this request are in flight at once.
+    batch_captions is the future from start_caption_batch, or None for per-post captions.
+    With a deadline, posts that can't finish in time are dropped and counted in deadline.skipped.
+    Queries whose post raised an error are appended to failures (a list), if given.
+    """
+    limit = min(max_concurrency or FEED_MAX_CONCURRENCY, FEED_MAX_CONCURRENCY)
+    limit = max(limit, 1)
+
+    queued = list(enumerate(image_queries))
+    pending = {}
+
+    try:
+        while queued or pending:
+            # Don't start posts that have no realistic chance of finishing in time
+            if deadline and queued and deadline.remaining() < FEED_MIN_POST_SECONDS:
+                print(f"⏱️ Deadline close, skipping {len(queued)} unstarted posts")
+                deadline.skipped += len(queued)
+                queued = []
+
+            # Top up the window for this request
+            while queued and len(pending) < limit:
+                index, query = queued.pop(0)
+                future = feed_executor.submit(build_post, topic, query, batch_captions, deadline)
+                pending[future] = (index, query)
+
+            if not pending:
+                break
+
+            done, _ = wait(
+                pending,
+                timeout=deadline.remaining() if deadline else None,
+                return_when=FIRST_COMPLETED
+            )
+
+            if not done:
+                # Out of time - return what is ready and abandon the rest
+                print(f"⏱️ Deadline reached, dropping {len(pending)} unfinished posts")
+                deadline.skipped += len(pending)
+                return
+
+            for future in done:
+                index, query = pending.pop(future)
+                try:
+                    post = future.result()
+                except DeadlineExceeded as e:
+                    print(f"⏱️ Skipped post for '{query}': {e}")
+                    deadline.skipped += 1
+                    post = None
+                except Exception as e:
+                    print(f"❌ Failed to build post for '{query}': {e}")
+                    if failures is not None:
+                        failures.append(query)
+                    post = None
+                yield index, post
+    finally:
+        # Client went away or caller stopped early - don't leave queued work behind
+        for future in pending:
+            future.cancel()
+
+
+def start_caption_batch(topic, image_queries):
+    """
+    Kick off the batched caption call on the feed pool so it overlaps the image searches.
+    It is submitted before any post of the request, so the pool's FIFO queue always
+    starts it ahead of the posts that wait on it.
+    """
+    return feed_executor.submit(generate_captions_batch, topic, image_queries)
+
+
+def iter_generated_posts(topic, max_concurrency=None, batch_captions=None, progress=None, deadline=None, failures=None):
+    """
+    Generate a topic's feed, yielding (index, post) as soon as each post is ready.
+    Flow: 1) Generate image queries -> 2) Fetch images + captions concurrently
+    batch_captions overrides FEED_BATCH_CAPTIONS for this call.
+    progress, if given, is called as progress(completed, total) as posts finish.
+    deadline (a Deadline) bounds the whole generation; check deadline.partial afterwards.
+    failures (a list) collects the queries whose post failed with an error.
+    Raises DeadlineExceeded if even the image queries can't be generated in time.
+    """
+    if batch_captions is None:
+        batch_captions = FEED_BATCH_CAPTIONS
+
+    if deadline:
+        # Run on the pool so a slow model call can't hold the request past its deadline
+        queries_future = feed_executor.submit(generate_image_queries, topic)
+        try:
+            image_queries = queries_future.result(timeout=deadline.remaining())
+        except TimeoutError:
+            # Drops it from the pool queue if it hasn't started (a running call can't be stopped)
+            queries_future.cancel()
+            raise DeadlineExceeded("Deadline exceeded while generating image queries")
+    else:
+        image_queries = generate_image_queries(topic)
+    caption_future = start_caption_batch(topic, image_queries) if batch_captions else None
+
+    if progress:
+        progress(0, len(image_queries))
+
+    try:
+        completed = 0
+        for index, post in iter_feed_posts(topic, image_queries, max_concurrency, caption_future, deadline, failures):
+            completed += 1
+            if progress:
+                progress(completed, len(image_queries))
+            yield index, post
+    finally:
+        if caption_future is not None:
+            caption_future.cancel()
+
+
+def generate_feed_posts(topic, max_concurrency=None, batch_captions=None):
+    """
+    Generate the posts for a topic.
+    Posts are returned in the original query order.
+    """
+    results = {}
+    for index, post in iter_generated_posts(topic, max_concurrency, batch_captions):
+        if post:
+            results[index] = post
+
+    return [results[index] for index in sorted(results)]
+
+
+def get_or_generate_feed(topic, batch_captions=None, use_cache=True, progress=None, deadline_seconds=None):
+    """
+    Serve a topic from the feed cache, or generate it and refresh the cache.
+    Identical topics requested at the same time wait on a single generation
+    (and share its result, including whether it was partial).
+    progress is only reported to the request that runs the generation.
+    With deadline_seconds, whatever is ready by then is returned with partial=True;
+    partial feeds are not cached, and neither are feeds that lost posts to errors.
+    Returns {'posts': [...], 'cached': bool, 'partial': bool}.
+    """
+    if use_cache:
+        cached_posts = get_cached_feed(topic)
+        if cached_posts:
+            return {'posts': cached_posts, 'cached': True, 'partial': False}
+
+    deadline = Deadline(deadline_seconds) if deadline_seconds else None
+
+    def generate():
+        results = {}
+        failures = []
+        try:
+            for index, post in iter_generated_posts(
+                topic,
+                batch_captions=batch_captions,
+                progress=progress,
+                deadline=deadline,
+                failures=failures
+            ):
+                if post:
+                    results[index] = post
+        except DeadlineExceeded as e:
+            print(f"⏱️ {e} for '{topic}'")
+            deadline.skipped += 1
+
+        posts = [results[index] for index in sorted(results)]
+        partial = bool(deadline and deadline.partial)
+        # A transient S3/Bedrock error shouldn't pin a short feed in the cache for hours
+        if failures:
+            print(f"⚠️ Not caching '{topic}': {len(failures)} posts failed")
+        if not partial and not failures:
+            store_cached_feed(topic, posts)
+        return {'posts': posts, 'partial': partial}
+
+    try:
+        feed = feed_flight.do(
+            normalize_topic(topic),
+            generate,
+            timeout=deadline.remaining() if deadline else None
+        )
+    except TimeoutError:
+        # Joined someone else's generation and it didn't finish within our budget
+        return {'posts': [], 'cached': False, 'partial': True}
+
+    return {'posts': feed['posts'], 'cached': False, 'partial': feed['partial']}
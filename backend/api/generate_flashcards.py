@@ -1,181 +1,199 @@
 import os
 import json
-import boto3
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from .aws_clients import get_client
+from .s3_service import BUCKET_NAME, S3_REGION, key_from_s3_url, complete_presigned_upload, UnsupportedImage
+from .singleflight import SingleFlight
 
-@api_view(['POST'])
-def generate_flashcards(request):
+
+# Concurrent requests for the same image share one generation
+flashcards_flight = SingleFlight('generateFlashcards')
+
+
+def build_flashcards(s3_url):
     """
-    Extract text from uploaded image -> generate concept-based flashcards (summaries).
-    Each flashcard should explain one key concept or point.
+    OCR an uploaded image and generate concept flashcards from its text.
+    Returns (full_text, flashcards), or None if no readable text was found.
+    """
+    # Shared AWS clients (created once per process, see aws_clients)
+    region = os.getenv('AWS_DEFAULT_REGION', 'us-west-2')
+    # Rekognition can only read S3 objects in its own region, so it follows the bucket
+    rekog = get_client('rekognition', S3_REGION)
+
+    # Rekognition reads the image from S3 itself, so the bytes never pass through this worker
+    s3_image = {'S3Object': {'Bucket': BUCKET_NAME, 'Name': key_from_s3_url(s3_url)}}
+
+    # Perform OCR using Rekognition
+    response = rekog.detect_text(Image=s3_image)
+    extracted_texts = [
+        t['DetectedText'] for t in response.get('TextDetections', [])
+        if t['Type'] == 'LINE'
+    ]
+    full_text = "\n".join(extracted_texts)
+
+    if not full_text.strip():
+        return None
+
+    # Generate conceptual flashcards via Bedrock
+    bedrock = get_client('bedrock-runtime', region)
+
+    prompt = f"""
+    You are an AI tutor that creates flashcards for learning from educational notes or images.
+
+    Analyze the text below and create 2-5 flashcards that summarize and explain each main concept clearly.
+
+    Each flashcard should be a JSON object with a "topic" and an "explanation".
+    - The "topic" is a clear, specific concept name (2-5 words).
+    - The "explanation" is a concise summary (1-3 sentences) explaining that concept.
+    - Focus on the most important educational concepts from the text.
+
+    Text:
+    {full_text}
+
+    Return ONLY a valid JSON array with no extra text, markdown, or code blocks:
+    [
+      {{
+        "topic": "Main Concept 1",
+        "explanation": "Clear explanation of the first key concept from the text."
+      }},
+      {{
+        "topic": "Main Concept 2", 
+        "explanation": "Clear explanation of the second key concept from the text."
+      }}
+    ]
     """
-    try:
-        file_obj = request.FILES.get('file')
-        user_id = request.POST.get('userId')
-
-        if not file_obj:
-            return Response({'error': 'file is required'}, status=400)
-
-        # Upload image to S3
-        from .s3_service import upload_image_file
-        s3_url = upload_image_file(file_obj, user_id or 'default')
-        if not s3_url:
-            return Response({'error': 'Failed to upload image'}, status=500)
-
-        # Initialize AWS clients
-        region = os.getenv('AWS_DEFAULT_REGION', 'us-west-2')
-        s3_client = boto3.client(
-            's3',
-            region_name=region,
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
-        rekog = boto3.client(
-            'rekognition',
-            region_name=region,
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
-
-        # Extract object key from the S3 URL
-        key = s3_url.split(f"{os.getenv('S3_BUCKET_NAME')}.s3.{region}.amazonaws.com/")[-1]
-
-        # Get image bytes from S3
-        s3_response = s3_client.get_object(
-            Bucket=os.getenv('S3_BUCKET_NAME'),
-            Key=key
-        )
-        image_bytes = s3_response["Body"].read()
-
-        # Perform OCR using Rekognition
-        response = rekog.detect_text(Image={"Bytes": image_bytes})
-        extracted_texts = [
-            t['DetectedText'] for t in response.get('TextDetections', [])
-            if t['Type'] == 'LINE'
-        ]
-        full_text = "\n".join(extracted_texts)
-
-        if not full_text.strip():
-            return Response({'error': 'No readable text found in image'}, status=400)
 
-        # Generate conceptual flashcards via Bedrock
-        bedrock = boto3.client('bedrock-runtime', region_name=region)
-
-        prompt = f"""
-        You are an AI tutor that creates flashcards for learning from educational notes or images.
-
-        Analyze the text below and create 2-5 flashcards that summarize and explain each main concept clearly.
-
-        Each flashcard should be a JSON object with a "topic" and an "explanation".
-        - The "topic" is a clear, specific concept name (2-5 words).
-        - The "explanation" is a concise summary (1-3 sentences) explaining that concept.
-        - Focus on the most important educational concepts from the text.
-
-        Text:
-        {full_text}
-
-        Return ONLY a valid JSON array with no extra text, markdown, or code blocks:
-        [
-          {{
-            "topic": "Main Concept 1",
-            "explanation": "Clear explanation of the first key concept from the text."
-          }},
-          {{
-            "topic": "Main Concept 2", 
-            "explanation": "Clear explanation of the second key concept from the text."
-          }}
-        ]
-        """
-
-        result = bedrock.invoke_model(
-            modelId='meta.llama3-70b-instruct-v1:0',
-            body=json.dumps({
-                "prompt": prompt,
-                "max_gen_len": 1024,
-                "temperature": 0.7,
-                "top_p": 0.9
-            })
-        )
-
-        body = json.loads(result['body'].read())
-        text = (
-            body.get('generation')
-            or body.get('output')
-            or body.get('outputs', [{}])[0].get('text', '')
-        ).strip()
-
-        print("🧩 Bedrock raw output:", text)  # Debug log — useful while testing
-
-        # Improved JSON parsing with better topic extraction
+    result = bedrock.invoke_model(
+        modelId='meta.llama3-70b-instruct-v1:0',
+        body=json.dumps({
+            "prompt": prompt,
+            "max_gen_len": 1024,
+            "temperature": 0.7,
+            "top_p": 0.9
+        })
+    )
+
+    body = json.loads(result['body'].read())
+    text = (
+        body.get('generation')
+        or body.get('output')
+        or body.get('outputs', [{}])[0].get('text', '')
+    ).strip()
+
+    print("🧩 Bedrock raw output:", text)  # Debug log — useful while testing
+
+    # Improved JSON parsing with better topic extraction
+    try:
+        # Try to parse as JSON first
+        data = json.loads(text)
+        
+        # Validate that it's a list of flashcards with proper structure
+        if not isinstance(data, list):
+            raise ValueError("Not a list")
+        
+        # Clean up any flashcards that don't have proper topic/explanation
+        cleaned_data = []
+        for item in data:
+            if isinstance(item, dict) and 'topic' in item and 'explanation' in item:
+                cleaned_data.append({
+                    'topic': str(item['topic']).strip(),
+                    'explanation': str(item['explanation']).strip()
+                })
+        
+        if not cleaned_data:
+            raise ValueError("No valid flashcards found")
+            
+        data = cleaned_data
+        
+    except Exception as json_error:
+        print(f"JSON parsing failed: {json_error}")
+        
+        # Fallback: Try to extract content and create a meaningful topic
         try:
-            # Try to parse as JSON first
-            data = json.loads(text)
+            # Generate a topic based on the OCR text
+            topic_prompt = f"""
+            Analyze this text and create a short, descriptive topic title (2-4 words max):
             
-            # Validate that it's a list of flashcards with proper structure
-            if not isinstance(data, list):
-                raise ValueError("Not a list")
+            {full_text[:200]}...
             
-            # Clean up any flashcards that don't have proper topic/explanation
-            cleaned_data = []
-            for item in data:
-                if isinstance(item, dict) and 'topic' in item and 'explanation' in item:
-                    cleaned_data.append({
-                        'topic': str(item['topic']).strip(),
-                        'explanation': str(item['explanation']).strip()
-                    })
+            Topic title:"""
             
-            if not cleaned_data:
-                raise ValueError("No valid flashcards found")
-                
-            data = cleaned_data
+            topic_result = bedrock.invoke_model(
+                modelId='meta.llama3-70b-instruct-v1:0',
+                body=json.dumps({
+                    "prompt": topic_prompt,
+                    "max_gen_len": 50,
+                    "temperature": 0.3,
+                    "top_p": 0.9
+                })
+            )
             
-        except Exception as json_error:
-            print(f"JSON parsing failed: {json_error}")
+            topic_body = json.loads(topic_result['body'].read())
+            generated_topic = topic_body.get('generation', '').strip()
             
-            # Fallback: Try to extract content and create a meaningful topic
-            try:
-                # Generate a topic based on the OCR text
-                topic_prompt = f"""
-                Analyze this text and create a short, descriptive topic title (2-4 words max):
-                
-                {full_text[:200]}...
-                
-                Topic title:"""
-                
-                topic_result = bedrock.invoke_model(
-                    modelId='meta.llama3-70b-instruct-v1:0',
-                    body=json.dumps({
-                        "prompt": topic_prompt,
-                        "max_gen_len": 50,
-                        "temperature": 0.3,
-                        "top_p": 0.9
-                    })
-                )
-                
-                topic_body = json.loads(topic_result['body'].read())
-                generated_topic = topic_body.get('generation', '').strip()
-                
-                # Clean up the generated topic
-                generated_topic = generated_topic.replace('"', '').replace("'", '').strip()
-                if not generated_topic or len(generated_topic) > 50:
-                    generated_topic = "Study Notes"
-                
-            except Exception as topic_error:
-                print(f"Topic generation failed: {topic_error}")
-                # Determine topic from OCR text content
-                words = full_text.split()[:10]  # First 10 words
-                if len(words) >= 2:
-                    generated_topic = ' '.join(words[:3]).title()
-                else:
-                    generated_topic = "Study Notes"
+            # Clean up the generated topic
+            generated_topic = generated_topic.replace('"', '').replace("'", '').strip()
+            if not generated_topic or len(generated_topic) > 50:
+                generated_topic = "Study Notes"
             
-            # Create structured flashcard from the raw text
-            data = [{
-                "topic": generated_topic,
-                "explanation": text[:500] + "..." if len(text) > 500 else text
-            }]
+        except Exception as topic_error:
+            print(f"Topic generation failed: {topic_error}")
+            # Determine topic from OCR text content
+            words = full_text.split()[:10]  # First 10 words
+            if len(words) >= 2:
+                generated_topic = ' '.join(words[:3]).title()
+            else:
+                generated_topic = "Study Notes"
+        
+        # Create structured flashcard from the raw text
+        data = [{
+            "topic": generated_topic,
+            "explanation": text[:500] + "..." if len(text) > 500 else text
+        }]
+
+    return full_text, data
+
+
+@api_view(['POST'])
+def generate_flashcards(request):
+    """
+    Extract text from uploaded image -> generate concept-based flashcards (summaries).
+    Each flashcard should explain one key concept or point.
+    Takes either a multipart 'file' or the 'key' of a direct upload from createUpload.
+    """
+    try:
+        file_obj = request.FILES.get('file')
+        key = request.data.get('key')
+        user_id = request.data.get('userId')
+
+        if not file_obj and not key:
+            return Response({'error': 'file or key is required'}, status=400)
+
+        if key:
+            # Image already uploaded straight to S3 via createUpload
+            try:
+                s3_url = complete_presigned_upload(user_id, key)
+            except (ValueError, UnsupportedImage) as e:
+                return Response({'error': str(e)}, status=400)
+        else:
+            # Upload image to S3
+            from .s3_service import upload_image_file
+            try:
+                s3_url = upload_image_file(file_obj, user_id or 'default')
+            except UnsupportedImage as e:
+                return Response({'error': str(e)}, status=400)
+            if not s3_url:
+                return Response({'error': 'Failed to upload image'}, status=500)
+
+        # Identical images share one S3 key (content hash), so concurrent
+        # submissions of the same image wait on a single OCR + Bedrock run
+        generated = flashcards_flight.do(s3_url, build_flashcards, s3_url)
+        if generated is None:
+            return Response({'error': 'No readable text found in image'}, status=400)
+
+        full_text, data = generated
 
         # Save flashcard set to database if we have valid data and user_id
         if user_id and data and len(data) > 0:
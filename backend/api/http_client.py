@@ -0,0 +1,133 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Distinct hosts whose connection pools are kept alive
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '32'))
+# Keep-alive connections per host (one feed fetches 16+ images, often from the same CDN)
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '16'))
+# Retries for connection errors and 429/5xx answers, with exponential backoff plus jitter.
+# Read timeouts are never retried, so a call's timeout isn't multiplied by the retries
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+# Cap on the connect phase of each attempt (the caller's timeout still bounds the read)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '1.5'))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', '0.25'))
+HTTP_BACKOFF_JITTER = float(os.getenv('HTTP_BACKOFF_JITTER', '0.25'))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '2'))
+# Responses bigger than this are abandoned instead of buffered
+HTTP_MAX_RESPONSE_BYTES = int(os.getenv('HTTP_MAX_RESPONSE_BYTES', str(10 * 1024 * 1024)))
+HTTP_CHUNK_SIZE = 64 * 1024
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """Raised when a response body exceeds the size cap"""
+
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        # False re-raises the read timeout as-is (requests' ReadTimeout) instead of retrying it
+        read=False,
+        status=HTTP_MAX_RETRIES,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        backoff_max=HTTP_BACKOFF_MAX,
+        respect_retry_after_header=True,
+        # Hand the last 429/5xx back to the caller instead of raising MaxRetryError
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        # Past pool_maxsize, extra connections are opened and closed after use rather than
+        # waited for (a blocked wait would ignore the caller's deadline)
+        pool_block=False,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Shared by every thread: connection pools are thread safe and we never rely on cookies
+http_session = _build_session()
+
+
+def request_timeout(timeout):
+    """(connect, read) timeout for one call: a short connect phase, the caller's timeout for the read"""
+    if timeout is None or isinstance(timeout, tuple):
+        return timeout
+    return (min(HTTP_CONNECT_TIMEOUT, timeout), timeout)
+
+
+def check_content_length(response, max_bytes=HTTP_MAX_RESPONSE_BYTES):
+    """Reject a response up front when its declared size is over the cap"""
+    declared = response.headers.get('Content-Length')
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise ResponseTooLarge(f"Response of {declared} bytes exceeds {max_bytes} byte limit: {response.url[:80]}")
+
+
+def iter_limited(response, max_bytes=HTTP_MAX_RESPONSE_BYTES, chunk_size=HTTP_CHUNK_SIZE):
+    """Yield a streamed response body in chunks, raising ResponseTooLarge past max_bytes"""
+    check_content_length(response, max_bytes)
+
+    received = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            response.close()
+            raise ResponseTooLarge(f"Response exceeds {max_bytes} byte limit: {response.url[:80]}")
+        yield chunk
+
+
+def get(url, max_bytes=HTTP_MAX_RESPONSE_BYTES, timeout=None, **kwargs):
+    """
+    GET through the pooled session with the body read under a size cap.
+    The returned response behaves like a normal requests response (.content, .json()).
+    """
+    response = http_session.get(url, stream=True, timeout=request_timeout(timeout), **kwargs)
+    try:
+        # Same trick requests uses internally: once _content is set, .content/.json() use it
+        response._content = b''.join(iter_limited(response, max_bytes))
+    finally:
+        # Fully read (or closed), so the connection goes back to the pool
+        response.close()
+    return response
+
+
+def get_http_client_stats():
+    """Per-host keep-alive pool usage of the shared session (reads urllib3 internals, so best effort)"""
+    hosts = {}
+    # http:// and https:// share one adapter
+    adapters = {id(adapter): adapter for adapter in http_session.adapters.values()}
+    for adapter in adapters.values():
+        manager = getattr(adapter, 'poolmanager', None)
+        if manager is None:
+            continue
+        for pool_key in manager.pools.keys():
+            pool = manager.pools.get(pool_key)
+            if pool is None or pool.pool is None:
+                continue
+            hosts[f"{pool.scheme}://{pool.host}"] = {
+                'in_use': pool.pool.maxsize - pool.pool.qsize(),
+                'opened': pool.num_connections,
+                'requests': pool.num_requests,
+            }
+
+    return {
+        'pool_connections': HTTP_POOL_CONNECTIONS,
+        'pool_maxsize': HTTP_POOL_MAXSIZE,
+        'max_retries': HTTP_MAX_RETRIES,
+        'max_response_bytes': HTTP_MAX_RESPONSE_BYTES,
+        'hosts': hosts,
+    }
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from . import http_client
+from .deadline import DeadlineExceeded
+from .image_search_cache import get_cached_image, store_cached_image
+
+# sequential: Bing only after Google fails or finds nothing
+# hedged: also start Bing if Google hasn't answered within IMAGE_SEARCH_HEDGE_DELAY
+# parallel: start every provider at once
+IMAGE_SEARCH_MODE = os.getenv('IMAGE_SEARCH_MODE', 'hedged')
+IMAGE_SEARCH_HEDGE_DELAY = float(os.getenv('IMAGE_SEARCH_HEDGE_DELAY', '1.0'))
+IMAGE_SEARCH_TIMEOUT = float(os.getenv('IMAGE_SEARCH_TIMEOUT', '5'))
+IMAGE_SEARCH_WORKERS = int(os.getenv('IMAGE_SEARCH_WORKERS', '16'))
+# Latency samples kept per provider for the stats
+IMAGE_SEARCH_STATS_WINDOW = int(os.getenv('IMAGE_SEARCH_STATS_WINDOW', '500'))
+
+# Provider calls get their own pool: search_image runs on the feed pool and waits on them
+search_executor = ThreadPoolExecutor(
+    max_workers=IMAGE_SEARCH_WORKERS,
+    thread_name_prefix='image-search'
+)
+
+_stats_lock = threading.Lock()
+_provider_stats = {}
+
+
+def search_google(query, timeout=5):
+    """First Google Custom Search image result, None if nothing matched. Raises on request errors."""
+    google_api_key = os.getenv('GOOGLE_API_KEY')
+    google_search_engine_id = os.getenv('GOOGLE_SEARCH_ENGINE_ID')
+
+    google_url = f"https://www.googleapis.com/customsearch/v1?q={query}&cx={google_search_engine_id}&key={google_api_key}&searchType=image&num=1&imgSize=large"
+    google_response = http_client.get(google_url, timeout=timeout)
+    google_response.raise_for_status()
+
+    google_data = google_response.json()
+    if google_data.get('items'):
+        return google_data['items'][0]['link']
+    return None
+
+
+def search_bing(query, timeout=5):
+    """First Bing image result, None if nothing matched. Raises on request errors."""
+    bing_api_key = os.getenv('BING_API_KEY')
+
+    bing_url = f"https://api.bing.microsoft.com/v7.0/images/search?q={query}&count=1&imageType=Photo&aspect=Wide"
+    bing_response = http_client.get(
+        bing_url,
+        headers={'Ocp-Apim-Subscription-Key': bing_api_key},
+        timeout=timeout
+    )
+    bing_response.raise_for_status()
+
+    bing_data = bing_response.json()
+    if bing_data.get('value'):
+        return bing_data['value'][0]['contentUrl']
+    return None
+
+
+def get_image_providers():
+    """Image search providers with credentials configured, in priority order"""
+    providers = []
+    if os.getenv('GOOGLE_API_KEY') and os.getenv('GOOGLE_SEARCH_ENGINE_ID'):
+        providers.append(('Google', search_google))
+    if os.getenv('BING_API_KEY'):
+        providers.append(('Bing', search_bing))
+    return providers
+
+
+def _record_latency(name, seconds, outcome):
+    with _stats_lock:
+        stats = _provider_stats.setdefault(name, {
+            'latencies': deque(maxlen=IMAGE_SEARCH_STATS_WINDOW),
+            'found': 0,
+            'empty': 0,
+            'errors': 0,
+        })
+        stats['latencies'].append(seconds)
+        stats[outcome] += 1
+
+
+def _timed_search(name, provider, query, timeout):
+    """Call one provider and record its latency and outcome"""
+    start = time.monotonic()
+    try:
+        source_image_url = provider(query, timeout=timeout)
+    except Exception:
+        _record_latency(name, time.monotonic() - start, 'errors')
+        raise
+    _record_latency(name, time.monotonic() - start, 'found' if source_image_url else 'empty')
+    return source_image_url
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[int(round(fraction * (len(sorted_values) - 1)))]
+
+
+def get_image_search_provider_stats():
+    """Per-provider latency percentiles (seconds) over the last IMAGE_SEARCH_STATS_WINDOW calls"""
+    with _stats_lock:
+        snapshot = {
+            name: (sorted(stats['latencies']), stats['found'], stats['empty'], stats['errors'])
+            for name, stats in _provider_stats.items()
+        }
+
+    providers = {}
+    for name, (latencies, found, empty, errors) in snapshot.items():
+        providers[name] = {
+            'found': found,
+            'empty': empty,
+            'errors': errors,
+            'samples': len(latencies),
+            'p50': round(_percentile(latencies, 0.50), 3) if latencies else None,
+            'p95': round(_percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(_percentile(latencies, 0.99), 3) if latencies else None,
+        }
+
+    return {
+        'mode': IMAGE_SEARCH_MODE,
+        'hedge_delay': IMAGE_SEARCH_HEDGE_DELAY,
+        'providers': providers,
+    }
+
+
+def _search_providers(query, providers, deadline=None):
+    """
+    Ask the providers for an image according to IMAGE_SEARCH_MODE.
+    The first provider to find an image wins; later providers are only started when
+    an earlier one fails, comes back empty, or (hedged) is slower than the hedge delay.
+    Returns (source_url, provider_name, any_provider_failed).
+    """
+    if IMAGE_SEARCH_MODE == 'parallel':
+        hedge_delay = 0
+    elif IMAGE_SEARCH_MODE == 'hedged':
+        hedge_delay = IMAGE_SEARCH_HEDGE_DELAY
+    else:
+        hedge_delay = None  # sequential: never start the next provider early
+
+    waiting = list(providers)
+    running = {}
+    failed = False
+
+    def start_next():
+        name, provider = waiting.pop(0)
+        if deadline:
+            deadline.check(f"{name} image search")
+        timeout = deadline.timeout(IMAGE_SEARCH_TIMEOUT) if deadline else IMAGE_SEARCH_TIMEOUT
+        running[search_executor.submit(_timed_search, name, provider, query, timeout)] = name
+
+    try:
+        start_next()
+
+        while running:
+            if waiting and hedge_delay is not None:
+                timeout = hedge_delay
+            else:
+                timeout = deadline.remaining() if deadline else None
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if waiting and hedge_delay is not None:
+                    print(f"↪️ Hedging image search for '{query}' with {waiting[0][0]}")
+                    start_next()
+                    continue
+                raise DeadlineExceeded("Deadline exceeded during image search")
+
+            for future in done:
+                name = running.pop(future)
+                try:
+                    source_image_url = future.result()
+                except Exception as e:
+                    print(f"{name} Image Search error: {e}")
+                    failed = True
+                    source_image_url = None
+
+                if source_image_url:
+                    print(f"✓ Found {name} Image: {query}")
+                    return source_image_url, name, failed
+
+            # Every provider that has answered came back empty or failed - try the next one now
+            if waiting and not running:
+                start_next()
+
+        return None, '', failed
+
+    finally:
+        # Losing providers: drop queued calls, ignore the result of ones already running
+        for future in running:
+            future.cancel()
+
+
+def search_image(query, deadline=None):
+    """
+    Find a source image URL for a query (Google first, Bing as fallback or hedge).
+    Results, including "nothing found", are kept in the image search cache.
+    """
+    providers = get_image_providers()
+    if not providers:
+        return None
+
+    hit, cached_url = get_cached_image(query)
+    if hit:
+        return cached_url
+
+    source_image_url, found_by, failed = _search_providers(query, providers, deadline)
+
+    # Only cache a miss when every provider actually answered; errors are retried next time
+    if source_image_url or not failed:
+        store_cached_image(query, source_image_url, found_by)
+
+    return source_image_url
@@ -0,0 +1,102 @@
+import os
+import re
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .cache_counters import CacheCounters
+from .models import ImageSearchResult
+
+# How long a resolved query -> image URL is reused
+IMAGE_SEARCH_CACHE_TTL_SECONDS = int(os.getenv('IMAGE_SEARCH_CACHE_TTL_SECONDS', str(7 * 24 * 60 * 60)))
+# Queries that found nothing are retried sooner
+IMAGE_SEARCH_NEGATIVE_TTL_SECONDS = int(os.getenv('IMAGE_SEARCH_NEGATIVE_TTL_SECONDS', str(60 * 60)))
+# Least recently used queries are evicted past this many rows
+IMAGE_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('IMAGE_SEARCH_CACHE_MAX_ENTRIES', '10000'))
+
+# Cached "no image found" answers are hits too
+_counters = CacheCounters('stores', 'evictions', 'errors', hit_names=('hits', 'negative_hits'))
+
+
+def normalize_query(query):
+    """Normalize a search query so trivially different spellings share a cache row"""
+    return re.sub(r'\s+', ' ', str(query)).strip().lower()[:255]
+
+
+def get_cached_image(query):
+    """
+    Look up a query in the image search cache.
+    Returns (hit, source_url); source_url is None on a negative hit.
+    The cache is best effort: a database error counts as a miss.
+    """
+    try:
+        entry = ImageSearchResult.objects.filter(query=normalize_query(query)).first()
+    except DatabaseError as e:
+        print(f"⚠️ Image search cache lookup failed: {e}")
+        _counters.count('errors')
+        entry = None
+
+    if entry is not None:
+        ttl = IMAGE_SEARCH_CACHE_TTL_SECONDS if entry.source_url else IMAGE_SEARCH_NEGATIVE_TTL_SECONDS
+        if entry.created_at >= timezone.now() - timedelta(seconds=ttl):
+            # Touch last_accessed_at so eviction keeps popular queries (skipped if the DB is busy)
+            try:
+                ImageSearchResult.objects.filter(pk=entry.pk).update(last_accessed_at=timezone.now())
+            except DatabaseError:
+                _counters.count('errors')
+            _counters.count('hits' if entry.source_url else 'negative_hits')
+            return True, entry.source_url
+
+    _counters.count('misses')
+    return False, None
+
+
+def store_cached_image(query, source_url, provider=''):
+    """
+    Remember the result of a search (source_url=None caches "nothing found").
+    Runs on the feed pool, so it uses single-statement writes (update, else insert-ignore)
+    and skips the store if the database is busy rather than failing the post.
+    """
+    cache_key = normalize_query(query)
+    now = timezone.now()
+
+    try:
+        updated = ImageSearchResult.objects.filter(query=cache_key).update(
+            source_url=source_url, provider=provider, created_at=now, last_accessed_at=now
+        )
+        if not updated:
+            # A concurrent store of the same query may win the insert; either row is fine
+            ImageSearchResult.objects.bulk_create(
+                [ImageSearchResult(query=cache_key, source_url=source_url, provider=provider)],
+                ignore_conflicts=True
+            )
+        _counters.count('stores')
+
+        evict_image_search_cache()
+    except DatabaseError as e:
+        print(f"⚠️ Image search cache store skipped for '{cache_key}': {e}")
+        _counters.count('errors')
+
+
+def evict_image_search_cache():
+    """Drop the least recently used rows beyond IMAGE_SEARCH_CACHE_MAX_ENTRIES"""
+    overflow = ImageSearchResult.objects.count() - IMAGE_SEARCH_CACHE_MAX_ENTRIES
+    if overflow <= 0:
+        return
+
+    stale_ids = list(
+        ImageSearchResult.objects.order_by('last_accessed_at').values_list('pk', flat=True)[:overflow]
+    )
+    deleted, _ = ImageSearchResult.objects.filter(pk__in=stale_ids).delete()
+    _counters.count('evictions', deleted)
+
+
+def get_image_search_cache_stats():
+    """Hit/miss counters for this process plus the current number of cached queries"""
+    stats = _counters.stats()
+    stats['entries'] = ImageSearchResult.objects.count()
+    stats['max_entries'] = IMAGE_SEARCH_CACHE_MAX_ENTRIES
+    stats['ttl_seconds'] = IMAGE_SEARCH_CACHE_TTL_SECONDS
+    stats['negative_ttl_seconds'] = IMAGE_SEARCH_NEGATIVE_TTL_SECONDS
+    return stats
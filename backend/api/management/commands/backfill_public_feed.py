@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.dynamodb_service import ensure_public_feed_index, backfill_public_feed_index, backfill_feed_headers, PUBLIC_FEED_INDEX
+
+
+class Command(BaseCommand):
+    help = "Create the public-feed GSI on an existing posts table, index existing posts and create missing feed headers"
+
+    def handle(self, *args, **options):
+        if ensure_public_feed_index():
+            self.stdout.write(f"✓ Creating {PUBLIC_FEED_INDEX} (backfilling while the index builds is fine)")
+        else:
+            self.stdout.write(f"✓ {PUBLIC_FEED_INDEX} already exists")
+
+        updated_count = backfill_public_feed_index()
+        self.stdout.write(self.style.SUCCESS(f"✓ Indexed {updated_count} existing posts"))
+
+        feed_count = backfill_feed_headers()
+        self.stdout.write(self.style.SUCCESS(f"✓ Checked feed headers for {feed_count} feeds"))
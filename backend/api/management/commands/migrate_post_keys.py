@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.dynamodb_service import migrate_post_keys
+
+
+class Command(BaseCommand):
+    help = "Re-key posts whose postId doesn't start with their topic so topic queries can use a key condition"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be re-keyed")
+
+    def handle(self, *args, **options):
+        post_count, like_count = migrate_post_keys(dry_run=options['dry_run'])
+
+        verb = "Would re-key" if options['dry_run'] else "Re-keyed"
+        self.stdout.write(self.style.SUCCESS(f"✓ {verb} {post_count} posts and {like_count} likes"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.dynamodb_service import normalize_like_items
+
+
+class Command(BaseCommand):
+    help = "Replace the post copies stored in likes with references to the post"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many likes would change")
+
+    def handle(self, *args, **options):
+        converted = normalize_like_items(dry_run=options['dry_run'])
+
+        verb = "Would convert" if options['dry_run'] else "Converted"
+        self.stdout.write(self.style.SUCCESS(f"✓ {verb} {converted} likes to post references"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.dynamodb_service import provision_tables
+
+
+class Command(BaseCommand):
+    help = "Create any missing DynamoDB tables and GSIs used by the API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-wait', action='store_true', help="Don't wait for new indexes to become active")
+
+    def handle(self, *args, **options):
+        report = provision_tables(wait=not options['no_wait'])
+
+        for table_name, created in report.items():
+            if created:
+                self.stdout.write(self.style.SUCCESS(f"✓ {table_name}: created {', '.join(created)}"))
+            else:
+                self.stdout.write(f"✓ {table_name}: up to date")
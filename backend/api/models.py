@@ -7,11 +7,18 @@ class FeedSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 # CachedFeed stores cached results for quick reloads
+# Generated feeds are shared across users, keyed on the normalized topic (no session)
 class CachedFeed(models.Model):
-    session = models.ForeignKey(FeedSession, on_delete=models.CASCADE)
+    session = models.ForeignKey(FeedSession, on_delete=models.CASCADE, null=True, blank=True)
     endpoint = models.CharField(max_length=32)
+    cache_key = models.CharField(max_length=255, db_index=True, default='')
     data = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = ('endpoint', 'cache_key')
 
 # Post stores generated posts with optional image/audio URLs
 class Post(models.Model):
@@ -33,3 +40,25 @@ class QueryLog(models.Model):
     query = models.TextField()
     response = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+# ImageSearchResult caches query -> source image URL across worker processes
+# source_url is null for queries where no provider found an image (negative cache)
+class ImageSearchResult(models.Model):
+    query = models.CharField(max_length=255, unique=True)
+    source_url = models.URLField(max_length=2048, blank=True, null=True)
+    provider = models.CharField(max_length=32, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(auto_now=True, db_index=True)
+
+# FeedJob holds the status and result of a background feed generation, so any worker
+# process can answer getFeedJob (the generation itself runs in the submitting process)
+class FeedJob(models.Model):
+    job_id = models.CharField(max_length=32, unique=True)
+    topic = models.TextField()
+    status = models.CharField(max_length=16, default='queued')
+    progress = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True, db_index=True)
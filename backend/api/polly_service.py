@@ -1,16 +1,9 @@
-import boto3
-import os
 import json
 import hashlib
+from .aws_clients import get_client
 from .s3_service import s3_client, BUCKET_NAME, S3_REGION
 
-# Initialize Polly client
-polly_client = boto3.client(
-    'polly',
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
+polly_client = get_client('polly')
 
 
 def generate_audio_explanation(topic, image_context, caption):
@@ -1,26 +1,181 @@
-import boto3
 import os
 import requests
-from datetime import datetime
 import hashlib
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from botocore.exceptions import NoCredentialsError
-import uuid
 from dotenv import load_dotenv
 
+from .aws_clients import get_client
+from . import http_client
+
 load_dotenv()
 
-# Initialize S3 client
-s3_client = boto3.client(
-    's3',
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
+s3_client = get_client('s3')
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'quickly-images')
 S3_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
 
+# Media is content-addressed: media/<sha256 of the bytes>.<ext>
+MEDIA_PREFIX = 'media'
+# How many known object keys / source URLs this process remembers
+MEDIA_INDEX_MAX_ENTRIES = int(os.getenv('MEDIA_INDEX_MAX_ENTRIES', '10000'))
+
+# Fetched images are streamed: bodies over IMAGE_MAX_BYTES are abandoned mid-download,
+# and only IMAGE_SPOOL_BYTES per download is held in memory before spilling to a temp file
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(10 * 1024 * 1024)))
+IMAGE_SPOOL_BYTES = int(os.getenv('IMAGE_SPOOL_BYTES', str(1024 * 1024)))
+# Uploads above the threshold go to S3 as multipart, in parts of S3_MULTIPART_CHUNK_BYTES
+S3_MULTIPART_THRESHOLD_BYTES = int(os.getenv('S3_MULTIPART_THRESHOLD_BYTES', str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNK_BYTES = int(os.getenv('S3_MULTIPART_CHUNK_BYTES', str(8 * 1024 * 1024)))
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD_BYTES,
+    multipart_chunksize=S3_MULTIPART_CHUNK_BYTES,
+    # Feed generation already uploads from many threads at once
+    max_concurrency=4,
+)
+
+# Leading bytes that identify the image formats we store: (magic, offset, ext, content type)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 0, 'jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'png', 'image/png'),
+    (b'GIF87a', 0, 'gif', 'image/gif'),
+    (b'GIF89a', 0, 'gif', 'image/gif'),
+    (b'WEBP', 8, 'webp', 'image/webp'),
+)
+IMAGE_SNIFF_BYTES = 12
+
+# Direct-to-S3 uploads: clients POST straight to uploads/<userId>/ with a presigned form,
+# then call back with the key; the bytes never pass through a Django worker
+UPLOAD_PREFIX = 'uploads'
+UPLOAD_URL_TTL_SECONDS = int(os.getenv('UPLOAD_URL_TTL_SECONDS', '900'))
+# Uploads are read by Rekognition straight from S3, which takes at most 15MB per image
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(15 * 1024 * 1024)))
+UPLOAD_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+_bucket_ready = False
+_media_lock = threading.Lock()
+# Keys we've already seen in the bucket, so repeats skip the HEAD request too
+_known_keys = OrderedDict()
+# Source image URL -> S3 URL, so re-fetching a known image skips the download
+_source_url_index = OrderedDict()
+
+
+def _remember(index, key, value=True):
+    """Insert into a bounded LRU index"""
+    with _media_lock:
+        index[key] = value
+        index.move_to_end(key)
+        while len(index) > MEDIA_INDEX_MAX_ENTRIES:
+            index.popitem(last=False)
+
+
+def _recall(index, key):
+    with _media_lock:
+        value = index.get(key)
+        if value is not None:
+            index.move_to_end(key)
+        return value
+
+
+def ensure_bucket():
+    """create_bucket_if_not_exists, but only once per process"""
+    global _bucket_ready
+    if not _bucket_ready:
+        _bucket_ready = create_bucket_if_not_exists()
+    return _bucket_ready
+
+
+def get_s3_url(key):
+    """Public URL of an object in the bucket"""
+    return f"https://{BUCKET_NAME}.s3.{S3_REGION}.amazonaws.com/{key}"
+
+
+def key_from_s3_url(s3_url):
+    """Object key of one of our public S3 URLs"""
+    return s3_url.split(f"{BUCKET_NAME}.s3.{S3_REGION}.amazonaws.com/")[-1]
+
+
+def content_key(digest, ext):
+    """Canonical object key for content with the given sha256 hex digest"""
+    return f"{MEDIA_PREFIX}/{digest}.{ext}"
+
+
+def object_exists(key):
+    """Check whether an object is already stored (HEAD, memoized per process)"""
+    if _recall(_known_keys, key):
+        return True
+
+    try:
+        s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+    _remember(_known_keys, key)
+    return True
+
+
+class UnsupportedImage(Exception):
+    """Raised when downloaded bytes aren't a JPEG, PNG, GIF or WebP image"""
+
+
+def sniff_image_type(head):
+    """(extension, content type) from an image's leading bytes, or None if it isn't one we store"""
+    for magic, offset, ext, content_type in IMAGE_SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            if ext == 'webp' and head[:4] != b'RIFF':
+                continue
+            return ext, content_type
+    return None
+
+
+def spool_image(chunks):
+    """
+    Copy an image body into a spooled temp file while hashing it.
+    The format is sniffed from the first bytes, so non-images are rejected before the rest downloads.
+    Returns (file, sha256 hex digest, extension, content type); the caller closes the file.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=IMAGE_SPOOL_BYTES)
+    digest = hashlib.sha256()
+    head = b''
+    image_type = None
+
+    try:
+        for chunk in chunks:
+            if image_type is None:
+                head += chunk[:IMAGE_SNIFF_BYTES]
+                if len(head) >= IMAGE_SNIFF_BYTES:
+                    image_type = sniff_image_type(head)
+                    if image_type is None:
+                        raise UnsupportedImage(f"Not a supported image (starts with {head[:8]!r})")
+            digest.update(chunk)
+            spool.write(chunk)
+
+        if image_type is None:
+            image_type = sniff_image_type(head)
+            if image_type is None:
+                raise UnsupportedImage(f"Not a supported image ({len(head)} bytes)")
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    ext, content_type = image_type
+    return spool, digest.hexdigest(), ext, content_type
+
+
 def create_bucket_if_not_exists():
     """Create S3 bucket if it doesn't exist"""
     try:
@@ -81,76 +236,89 @@ def create_bucket_if_not_exists():
             print(f"Error accessing S3 bucket: {e}")
             return False
 
-def upload_image_from_url(image_url, image_query):
+def upload_image_from_url(image_url, image_query, timeout=10):
     """
     Download image from URL and upload to S3
+    Objects are keyed by the sha256 of their bytes, so repeated images are stored once.
     Returns the S3 URL
     """
     try:
+        known_url = _recall(_source_url_index, image_url)
+        if known_url:
+            print(f"✓ Already in S3: {image_url[:50]}")
+            return known_url
+
         # Ensure bucket exists
-        create_bucket_if_not_exists()
+        ensure_bucket()
 
-        # Download image from URL
+        # Stream the image into a spooled temp file (hashing and size-checking as it arrives)
         print(f"Downloading image from: {image_url[:50]}...")
-        response = requests.get(image_url, timeout=10, stream=True)
-
-        if response.status_code != 200:
-            print(f"Failed to download image: {response.status_code}")
-            return None
-
-        # Get content type
-        content_type = response.headers.get('Content-Type', 'image/jpeg')
-
-        # Determine file extension
-        if 'jpeg' in content_type or 'jpg' in content_type:
-            ext = 'jpg'
-        elif 'png' in content_type:
-            ext = 'png'
-        elif 'gif' in content_type:
-            ext = 'gif'
-        elif 'webp' in content_type:
-            ext = 'webp'
-        else:
-            ext = 'jpg'  # default
+        with http_client.http_session.get(image_url, timeout=http_client.request_timeout(timeout), stream=True) as response:
+            if response.status_code != 200:
+                print(f"Failed to download image: {response.status_code}")
+                return None
 
-        # Create unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        # Hash the query to avoid special characters
-        query_hash = hashlib.md5(image_query.encode()).hexdigest()[:8]
-        filename = f"posts/{timestamp}_{query_hash}.{ext}"
+            body, digest, ext, content_type = spool_image(
+                http_client.iter_limited(response, IMAGE_MAX_BYTES)
+            )
 
-        # Upload to S3 (bucket policy handles public access, no ACL needed)
-        s3_client.put_object(
-            Bucket=BUCKET_NAME,
-            Key=filename,
-            Body=response.content,
-            ContentType=content_type
-        )
+        with body:
+            filename = content_key(digest, ext)
 
-        # Generate S3 URL
-        s3_url = f"https://{BUCKET_NAME}.s3.{S3_REGION}.amazonaws.com/{filename}"
+            if object_exists(filename):
+                print(f"✓ Deduplicated S3 upload for '{image_query}': {filename}")
+            else:
+                # Upload to S3 (bucket policy handles public access, no ACL needed);
+                # large images go up as multipart straight from the temp file
+                s3_client.upload_fileobj(
+                    body,
+                    BUCKET_NAME,
+                    filename,
+                    ExtraArgs={'ContentType': content_type},
+                    Config=TRANSFER_CONFIG
+                )
+                _remember(_known_keys, filename)
+                print(f"✓ Uploaded to S3: {filename}")
 
-        print(f"✓ Uploaded to S3: {filename}")
+        # Generate S3 URL
+        s3_url = get_s3_url(filename)
+        _remember(_source_url_index, image_url, s3_url)
         return s3_url
 
     except requests.exceptions.RequestException as e:
         print(f"Error downloading image: {e}")
         return None
+    except UnsupportedImage as e:
+        print(f"Skipping image from {image_url[:50]}: {e}")
+        return None
     except Exception as e:
         print(f"Error uploading to S3: {e}")
         return None
 
 def delete_image(s3_url):
-    """Delete an image from S3 given its URL"""
+    """
+    Delete an image from S3 given its URL
+    Media objects are content-addressed and may be shared by several posts, so keys under
+    MEDIA_PREFIX are never deleted here (returns False).
+    """
     try:
         # Extract filename from URL
-        filename = s3_url.split(f"{BUCKET_NAME}.s3.{S3_REGION}.amazonaws.com/")[-1]
+        filename = key_from_s3_url(s3_url)
+
+        if filename.startswith(f"{MEDIA_PREFIX}/"):
+            print(f"⚠️ Not deleting shared media object: {filename}")
+            return False
 
         s3_client.delete_object(
             Bucket=BUCKET_NAME,
             Key=filename
         )
 
+        with _media_lock:
+            _known_keys.pop(filename, None)
+            for source_url in [u for u, url in _source_url_index.items() if url == s3_url]:
+                del _source_url_index[source_url]
+
         print(f"✓ Deleted from S3: {filename}")
         return True
     except Exception as e:
@@ -159,34 +327,128 @@ def delete_image(s3_url):
 def upload_image_file(file_obj: InMemoryUploadedFile, user_id: str):
     """
     Upload a local image file (from React Native FormData) to S3.
-    Returns the public S3 URL.
+    Uploads are content-addressed like fetched images, so the same photo is stored once.
+    The type comes from the file's bytes, not its name or the client's Content-Type.
+    Returns the public S3 URL; raises UnsupportedImage if the file isn't an image
+    or is over UPLOAD_MAX_BYTES.
     """
     try:
+        if file_obj.size > UPLOAD_MAX_BYTES:
+            raise UnsupportedImage(f"{file_obj.name} is over the {UPLOAD_MAX_BYTES // (1024 * 1024)}MB upload limit")
+
         # Ensure bucket exists
-        create_bucket_if_not_exists()
-
-        # Generate unique file name
-        file_extension = file_obj.name.split('.')[-1]
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"user_uploads/{user_id}/{timestamp}_{uuid.uuid4()}.{file_extension}"
-
-        # Upload file object
-        s3_client.upload_fileobj(
-            file_obj,
-            BUCKET_NAME,
-            filename,
-            ExtraArgs={
-                'ContentType': file_obj.content_type,
-            }
-        )
+        ensure_bucket()
+
+        # Hash in chunks so large uploads aren't read into memory at once
+        digest = hashlib.sha256()
+        head = b''
+        for chunk in file_obj.chunks():
+            if len(head) < IMAGE_SNIFF_BYTES:
+                head += chunk[:IMAGE_SNIFF_BYTES]
+            digest.update(chunk)
+
+        image_type = sniff_image_type(head)
+        if image_type is None:
+            raise UnsupportedImage(f"{file_obj.name} is not a JPEG, PNG, GIF or WebP image")
+        file_extension, content_type = image_type
+        filename = content_key(digest.hexdigest(), file_extension)
+
+        if object_exists(filename):
+            print(f"✓ Deduplicated upload from {user_id}: {filename}")
+        else:
+            file_obj.seek(0)
 
-        s3_url = f"https://{BUCKET_NAME}.s3.{S3_REGION}.amazonaws.com/{filename}"
+            # Upload file object
+            s3_client.upload_fileobj(
+                file_obj,
+                BUCKET_NAME,
+                filename,
+                ExtraArgs={
+                    'ContentType': content_type,
+                },
+                Config=TRANSFER_CONFIG
+            )
+            _remember(_known_keys, filename)
+
+        s3_url = get_s3_url(filename)
         print(f"✅ Uploaded local image to S3: {s3_url}")
         return s3_url
 
+    except UnsupportedImage:
+        raise
     except NoCredentialsError:
         print("❌ AWS credentials not configured properly.")
         return None
     except Exception as e:
         print(f"❌ Error uploading image file: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def _upload_prefix(user_id):
+    if not user_id or '/' in user_id:
+        raise ValueError('Invalid userId')
+    return f"{UPLOAD_PREFIX}/{user_id}/"
+
+
+def create_presigned_upload(user_id, content_type):
+    """
+    Presigned POST form for uploading one image straight to S3.
+    The policy pins the key, the Content-Type and a 1..UPLOAD_MAX_BYTES size range.
+    Returns {'key', 'url', 'fields', 'expiresIn'}; the client posts the fields plus 'file' to url.
+    """
+    ext = UPLOAD_CONTENT_TYPES.get(content_type)
+    if not ext:
+        raise ValueError(f"Unsupported contentType: {content_type}")
+
+    ensure_bucket()
+
+    key = f"{_upload_prefix(user_id)}{uuid.uuid4().hex}.{ext}"
+    presigned = s3_client.generate_presigned_post(
+        Bucket=BUCKET_NAME,
+        Key=key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, UPLOAD_MAX_BYTES],
+        ],
+        ExpiresIn=UPLOAD_URL_TTL_SECONDS
+    )
+
+    return {
+        'key': key,
+        'url': presigned['url'],
+        'fields': presigned['fields'],
+        'expiresIn': UPLOAD_URL_TTL_SECONDS,
+    }
+
+
+def complete_presigned_upload(user_id, key):
+    """
+    Check an object uploaded through create_presigned_upload and return its public S3 URL.
+    Only the first bytes are read (to sniff the format); uploads that aren't images are deleted.
+    Raises ValueError for keys outside the user's upload prefix or that were never uploaded.
+    """
+    if not key or not key.startswith(_upload_prefix(user_id)) or '..' in key:
+        raise ValueError('key does not belong to this user')
+
+    try:
+        head = s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            raise ValueError('Upload not found (expired or never completed)')
+        raise
+
+    first_bytes = s3_client.get_object(
+        Bucket=BUCKET_NAME,
+        Key=key,
+        Range=f"bytes=0-{IMAGE_SNIFF_BYTES - 1}"
+    )['Body'].read()
+
+    if head['ContentLength'] > UPLOAD_MAX_BYTES or sniff_image_type(first_bytes) is None:
+        s3_client.delete_object(Bucket=BUCKET_NAME, Key=key)
+        raise UnsupportedImage(f"Upload {key} is not a supported image")
+
+    _remember(_known_keys, key)
+    s3_url = get_s3_url(key)
+    print(f"✅ Direct upload completed: {s3_url}")
+    return s3_url
@@ -0,0 +1,92 @@
+import threading
+
+
+class _Call:
+    """One in-flight execution that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is still running wait and receive the same result or exception.
+    Nothing is cached - once the leader finishes, the next call runs again.
+    Results are shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {'leaders': 0, 'followers': 0}
+
+    def _enter(self, key):
+        """The call for key and whether this caller leads it (claims the key if free)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['leaders'] += 1
+                return call, True
+            self._stats['followers'] += 1
+            return call, False
+
+    def claim(self, key):
+        """
+        Become the leader for key without running anything, for a leader that produces
+        the result itself (e.g. while streaming it) and hands it over with finish().
+        Returns the call to finish, or None when one is already in flight (join it with do()).
+        """
+        with self._lock:
+            if key in self._calls:
+                return None
+            call = _Call()
+            self._calls[key] = call
+            self._stats['leaders'] += 1
+            return call
+
+    def finish(self, key, call, result=None, error=None):
+        """Release a claimed key and wake its followers with the result (or error)"""
+        call.result = result
+        call.error = error
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) for key, or wait for the call already in flight.
+        timeout bounds how long a follower waits; it then raises TimeoutError.
+        """
+        call, is_leader = self._enter(key)
+
+        if not is_leader:
+            print(f"⏳ Joining in-flight {self.name} for: {key}")
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight {self.name}: {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        result = error = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.finish(key, call, result=result, error=error)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
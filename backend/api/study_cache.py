@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+from django.core.cache import cache, caches
+
+from .cache_counters import CacheCounters
+
+# Saved flashcard / quiz sets are served from the Django cache (CACHES['default']) this long
+STUDY_CACHE_TTL_SECONDS = int(os.getenv('STUDY_CACHE_TTL_SECONDS', str(15 * 60)))
+
+STUDY_SET_KINDS = ('flashcards', 'quizzes')
+
+_MISSING = object()
+
+_counters = {kind: CacheCounters('invalidations') for kind in STUDY_SET_KINDS}
+
+
+def study_cache_key(kind, user_id, set_id):
+    """Cache key for one saved set (hashed so any backend accepts it)"""
+    digest = hashlib.sha256(f"{user_id}\n{set_id}".encode()).hexdigest()
+    return f"study:{kind}:{digest}"
+
+
+def get_cached_study_set(kind, user_id, set_id, load):
+    """
+    Read-through lookup: return the cached set, or call load() and cache what it returns.
+    A None result (set not found) is not cached.
+    """
+    key = study_cache_key(kind, user_id, set_id)
+
+    study_set = cache.get(key, _MISSING)
+    if study_set is not _MISSING:
+        _counters[kind].count('hits')
+        return study_set
+
+    _counters[kind].count('misses')
+    study_set = load()
+    if study_set is not None:
+        cache.set(key, study_set, STUDY_CACHE_TTL_SECONDS)
+    return study_set
+
+
+def invalidate_study_set(kind, user_id, set_id):
+    """Drop a set after it was changed or deleted"""
+    cache.delete(study_cache_key(kind, user_id, set_id))
+    _counters[kind].count('invalidations')
+
+
+def get_study_cache_stats():
+    """Hit/miss counters per kind of set for this process"""
+    stats = {kind: counters.stats() for kind, counters in _counters.items()}
+    stats['ttl_seconds'] = STUDY_CACHE_TTL_SECONDS
+    stats['backend'] = caches['default'].__class__.__name__
+    return stats
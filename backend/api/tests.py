@@ -1,3 +1,254 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import dynamodb_service
+from .deadline import Deadline, DeadlineExceeded
+from .dynamodb_service import (
+    PUBLIC_FEED_SHARD_KEYS,
+    decode_cursor,
+    encode_cursor,
+    get_public_feed_page,
+    query_page,
+    seeded_position,
+    _feistel_round_keys,
+)
+from .singleflight import SingleFlight
+
+
+class FakeTable:
+    """
+    Stand-in for a boto3 Table: query() pages through `items` in key order the way
+    DynamoDB does (Limit, ExclusiveStartKey, LastEvaluatedKey), so no AWS is needed.
+    """
+
+    def __init__(self, items, hash_key, range_key, key_attributes):
+        self.items = items
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.key_attributes = key_attributes
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        partition = next(iter(kwargs['ExpressionAttributeValues'].values()))
+        items = sorted(
+            (item for item in self.items if item[self.hash_key] == partition),
+            key=lambda item: item[self.range_key],
+            reverse=not kwargs.get('ScanIndexForward', True)
+        )
+
+        start = kwargs.get('ExclusiveStartKey')
+        if start:
+            position = [item[self.range_key] for item in items].index(start[self.range_key])
+            items = items[position + 1:]
+
+        limit = kwargs.get('Limit')
+        if limit is None or len(items) <= limit:
+            return {'Items': items}
+        page = items[:limit]
+        return {
+            'Items': page,
+            'LastEvaluatedKey': {name: page[-1][name] for name in self.key_attributes}
+        }
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_concurrently(self, flight, fn, callers=5, **kwargs):
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(flight.do('key', fn, **kwargs))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight('test')
+        runs = []
+
+        def slow():
+            runs.append(1)
+            time.sleep(0.2)
+            return 'result'
+
+        results, errors = self.run_concurrently(flight, slow)
+
+        self.assertEqual(runs, [1])
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(errors, [])
+        self.assertEqual(flight.stats(), {'leaders': 1, 'followers': 4, 'in_flight': 0})
+
+    def test_followers_get_the_leaders_error(self):
+        flight = SingleFlight('test')
+
+        def failing():
+            time.sleep(0.2)
+            raise RuntimeError('boom')
+
+        results, errors = self.run_concurrently(flight, failing, callers=3)
+
+        self.assertEqual(results, [])
+        self.assertEqual([str(e) for e in errors], ['boom'] * 3)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_follower_timeout(self):
+        flight = SingleFlight('test')
+        call = flight.claim('key')
+
+        with self.assertRaises(TimeoutError):
+            flight.do('key', lambda: 'unused', timeout=0.05)
+
+        flight.finish('key', call, result='done')
+        self.assertEqual(flight.do('key', lambda: 'next'), 'next')
+
+    def test_claimed_result_goes_to_followers(self):
+        flight = SingleFlight('test')
+        call = flight.claim('key')
+        self.assertIsNone(flight.claim('key'))
+
+        threading.Timer(0.1, flight.finish, args=('key', call), kwargs={'result': 'streamed'}).start()
+
+        self.assertEqual(flight.do('key', lambda: 'unused', timeout=5), 'streamed')
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_nothing_is_cached_between_calls(self):
+        flight = SingleFlight('test')
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+
+
+class SeededPositionTests(SimpleTestCase):
+    def test_is_a_permutation(self):
+        seed_keys = _feistel_round_keys('seed')
+        for size in (1, 2, 3, 7, 64, 100, 1000):
+            positions = [seeded_position(seed_keys, i, size) for i in range(size)]
+            self.assertEqual(sorted(positions), list(range(size)), size)
+
+    def test_same_seed_same_order(self):
+        first = [seeded_position(_feistel_round_keys('a'), i, 50) for i in range(50)]
+        again = [seeded_position(_feistel_round_keys('a'), i, 50) for i in range(50)]
+        other = [seeded_position(_feistel_round_keys('b'), i, 50) for i in range(50)]
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        data = {'userId': 'u1', 'postId': 'ai_1700000000_3'}
+        self.assertEqual(decode_cursor(encode_cursor(data)), data)
+
+    def test_malformed_cursor(self):
+        for cursor in ('!!', 'bm90IGpzb24', ''):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def user_table(self):
+        items = [{'userId': 'u1', 'postId': f"ai_{i:03d}"} for i in range(25)]
+        items.append({'userId': 'u2', 'postId': 'ai_000'})
+        return FakeTable(items, 'userId', 'postId', ('userId', 'postId'))
+
+    def test_query_page_resumes_from_cursor(self):
+        table = self.user_table()
+        seen, cursor = [], None
+        while True:
+            page = query_page(table, 'u1', limit=10, cursor=cursor, KeyConditionExpression='userId = :uid',
+                              ExpressionAttributeValues={':uid': 'u1'})
+            seen.extend(item['postId'] for item in page['items'])
+            if not page['has_more']:
+                break
+            cursor = page['next_cursor']
+
+        self.assertEqual(seen, [f"ai_{i:03d}" for i in range(25)])
+
+    def test_query_page_without_limit_or_cursor_returns_everything(self):
+        page = query_page(self.user_table(), 'u1', KeyConditionExpression='userId = :uid',
+                          ExpressionAttributeValues={':uid': 'u1'})
+
+        self.assertEqual(len(page['items']), 25)
+        self.assertFalse(page['has_more'])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_query_page_rejects_foreign_cursors(self):
+        table = self.user_table()
+        bad_keys = [
+            {'userId': 'u2', 'postId': 'ai_000'},
+            {'userId': 'u1'},
+            {'userId': 'u1', 'postId': 1},
+            {'userId': 'u1', 'postId': 'ai_000', 'extra': 'x'},
+            ['u1', 'ai_000'],
+        ]
+        for key in bad_keys:
+            with self.assertRaises(ValueError, msg=key):
+                query_page(table, 'u1', limit=5, cursor=encode_cursor(key))
+
+        with self.assertRaises(ValueError):
+            query_page(table, 'u1', limit=5, cursor=encode_cursor({'userId': 'u1', 'postId': 'bio_001'}),
+                       sort_prefix='ai_')
+
+    @mock.patch.object(dynamodb_service, '_visible_public_posts', lambda posts, headers: posts)
+    def test_public_feed_pages_merge_shards_newest_first(self):
+        posts = [
+            {
+                'userId': f"user{i % 3}",
+                'postId': f"post{i:03d}",
+                'publicShard': PUBLIC_FEED_SHARD_KEYS[i % len(PUBLIC_FEED_SHARD_KEYS)],
+                'createdAt': f"2024-01-01T00:00:{i:03d}",
+            }
+            for i in range(40)
+        ]
+        table = FakeTable(posts, 'publicShard', 'createdAt', ('userId', 'postId', 'publicShard', 'createdAt'))
+
+        seen, cursor = [], None
+        with mock.patch.object(dynamodb_service, 'get_posts_table', return_value=table):
+            while True:
+                page = get_public_feed_page(limit=7, cursor=cursor)
+                seen.extend(post['postId'] for post in page['posts'])
+                if not page['has_more']:
+                    break
+                cursor = page['next_cursor']
+
+        self.assertEqual(seen, [f"post{i:03d}" for i in reversed(range(40))])
+
+    def test_public_feed_rejects_forged_positions(self):
+        bad_cursors = [
+            {'public#unknown': {}},
+            {PUBLIC_FEED_SHARD_KEYS[0]: 5},
+            {PUBLIC_FEED_SHARD_KEYS[0]: {'userId': 'u1'}},
+            {PUBLIC_FEED_SHARD_KEYS[0]: {'userId': 'u', 'postId': 'p', 'publicShard': 'other', 'createdAt': 'x'}},
+        ]
+        table = FakeTable([], 'publicShard', 'createdAt', ('userId', 'postId', 'publicShard', 'createdAt'))
+        with mock.patch.object(dynamodb_service, 'get_posts_table', return_value=table):
+            for positions in bad_cursors:
+                with self.assertRaises(ValueError, msg=positions):
+                    get_public_feed_page(cursor=encode_cursor(positions))
+        self.assertEqual(table.calls, [])
+
+
+class DeadlineTests(SimpleTestCase):
+    def test_budget_runs_out(self):
+        deadline = Deadline(0.2)
+        self.assertFalse(deadline.expired())
+        self.assertLessEqual(deadline.timeout(10), 0.2)
+
+        time.sleep(0.25)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.timeout(10), 0.1)
+        with self.assertRaises(DeadlineExceeded):
+            deadline.check('caption')
+
+    def test_partial_once_posts_are_skipped(self):
+        deadline = Deadline(5)
+        self.assertFalse(deadline.partial)
+        deadline.skipped += 1
+        self.assertTrue(deadline.partial)
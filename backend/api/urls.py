@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('generateFeed', views.generate_feed, name='generate_feed'),
+    path('generateFeedStream', views.generate_feed_stream, name='generate_feed_stream'),
+    path('generateFeedJob', views.generate_feed_job, name='generate_feed_job'),
+    path('getFeedJob', views.get_feed_job_view, name='get_feed_job'),
     path('saveFeedPosts', views.save_feed_posts, name='save_feed_posts'),
     path('getFeed', views.get_feed, name='get_feed'),
     path('getPublicFeed', views.get_public_feed_view, name='get_public_feed'),
@@ -13,7 +16,10 @@ urlpatterns = [
     path('getLikedPosts', views.get_liked_posts, name='get_liked_posts'),
     path('getTopics', views.get_topics, name='get_topics'),
     path('health', views.health_check, name='health_check'),
+    path('cacheStats', views.cache_stats, name='cache_stats'),
     path('uploadImage', views.upload_image, name='upload_image'),
+    path('createUpload', views.create_upload, name='create_upload'),
+    path('completeUpload', views.complete_upload, name='complete_upload'),
     path('generateFlashcards', views.generate_flashcards, name='generate_flashcards'),
     path('generateQuiz', views.generate_quiz, name='generate_quiz'),
     path('getSavedFlashcards', views.get_saved_flashcards, name='get_saved_flashcards'),
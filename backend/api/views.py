@@ -1,32 +1,65 @@
 import json
-import boto3
-import requests
-import os
+import math
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .dynamodb_service import save_posts, get_user_posts, get_user_topics, like_post, unlike_post, get_user_likes, is_post_liked, get_posts_by_topic, delete_feed, get_public_feed, update_feed_privacy, get_user_flashcards, get_flashcard_by_id, delete_flashcard_set, get_user_quizzes, get_quiz_by_id, submit_quiz_score, delete_quiz_set
-from .s3_service import upload_image_from_url
+from .dynamodb_service import save_posts, get_user_posts, get_user_topics, like_post, unlike_post, get_user_likes, is_post_liked, annotate_liked, get_post_cache_stats, get_posts_by_topic, delete_feed, get_public_feed, get_public_feed_page, update_feed_privacy, get_user_flashcards, get_flashcard_by_id, delete_flashcard_set, get_user_quizzes, get_quiz_by_id, submit_quiz_score, delete_quiz_set
+from .feed_service import get_or_generate_feed, iter_generated_posts, feed_flight, FEED_MIN_DEADLINE_SECONDS, FEED_MAX_DEADLINE_SECONDS
+from .deadline import Deadline, DeadlineExceeded
+from .image_search import get_image_search_provider_stats
+from .feed_cache import get_cached_feed, store_cached_feed, get_feed_cache_stats, normalize_topic
+from .image_search_cache import get_image_search_cache_stats
+from .study_cache import get_study_cache_stats
+from .aws_clients import get_aws_client_stats
+from .http_client import get_http_client_stats
+from .feed_jobs import submit_feed_job, get_feed_job, JobQueueFull
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from .s3_service import upload_image_file
-from .generate_flashcards import generate_flashcards
-from .generate_quiz import generate_quiz
+from django.views.decorators.http import require_POST
+from .s3_service import upload_image_file, create_presigned_upload, complete_presigned_upload, UnsupportedImage
+from .generate_flashcards import generate_flashcards, flashcards_flight
+from .generate_quiz import generate_quiz, quiz_flight
 
 
+def parse_bool(value, default=None):
+    """Read a boolean flag sent as JSON (true/false) or form/query data ("true"/"false")"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def parse_deadline(value):
+    """
+    Read an optional deadline in seconds; raises ValueError unless it is a finite number between
+    FEED_MIN_DEADLINE_SECONDS (shorter ones would skip every post and return an empty feed)
+    and FEED_MAX_DEADLINE_SECONDS
+    """
+    if value is None or value == '':
+        return None
+    message = (
+        f'deadline must be a number of seconds between '
+        f'{FEED_MIN_DEADLINE_SECONDS:g} and {FEED_MAX_DEADLINE_SECONDS:g}'
+    )
+    try:
+        deadline = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(message)
+    if not math.isfinite(deadline) or not FEED_MIN_DEADLINE_SECONDS <= deadline <= FEED_MAX_DEADLINE_SECONDS:
+        raise ValueError(message)
+    return deadline
 
-# Initialize Bedrock client with credentials from environment
-bedrock_runtime = boto3.client(
-    service_name='bedrock-runtime',
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
 
 @api_view(['POST'])
 def generate_feed(request):
     """
     Generate 8 educational posts with IMAGE-AWARE captions
     Flow: 1) Generate image queries → 2) Fetch images → 3) Use vision LLM to generate captions based on actual images
+    Posts are built concurrently; the response keeps the original query order.
+    Popular topics are served from the feed cache unless useCache is false, and
+    concurrent requests for the same topic share one generation.
+    With deadline (seconds), posts not ready in time are dropped and partial is true.
     """
     try:
         topic = request.data.get('topic')
@@ -36,141 +69,222 @@ def generate_feed(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # STEP 1: Generate only image search queries (not captions yet)
-        image_query_prompt = f"""Generate 8 image search queries for "{topic}".
-Each query should find an educational image about this topic.
+        # Optional override of FEED_BATCH_CAPTIONS (one caption call for the whole feed)
+        batch_captions = parse_bool(request.data.get('batchCaptions'))
+        # useCache=false skips the lookup; the fresh feed still replaces the cached one
+        use_cache = parse_bool(request.data.get('useCache'), default=True)
 
-Return ONLY a JSON array with 8 strings.
-
-Example for "neural networks":
-["neural network diagram", "artificial neuron structure", "deep learning layers", "brain neurons microscope", "AI neural pathways", "convolutional neural network", "recurrent neural network", "neural network training process"]
+        try:
+            deadline_seconds = parse_deadline(request.data.get('deadline'))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-JSON array:"""
+        feed = get_or_generate_feed(
+            topic,
+            batch_captions=batch_captions,
+            use_cache=use_cache,
+            deadline_seconds=deadline_seconds
+        )
 
-        request_body = {
-            "prompt": image_query_prompt,
-            "max_gen_len": 512,
-            "temperature": 0.7,
-            "top_p": 0.9
-        }
+        return Response({
+            'topic': topic,
+            'posts': feed['posts'],
+            'cached': feed['cached'],
+            'partial': feed['partial']
+        }, status=status.HTTP_200_OK)
 
-        response = bedrock_runtime.invoke_model(
-            modelId='meta.llama3-70b-instruct-v1:0',
-            body=json.dumps(request_body)
+    except Exception as e:
+        import traceback
+        print(f"❌ Error in generate_feed: {str(e)}")
+        print(traceback.format_exc())
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-        response_body = json.loads(response['body'].read())
-        content_text = response_body['generation']
 
-        # Extract JSON array of image queries
+def format_stream_record(record, use_sse):
+    """Encode one streamed record as an NDJSON line or an SSE event"""
+    payload = json.dumps(record, default=str)
+    if use_sse:
+        return f"event: {record['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+@csrf_exempt
+@require_POST
+def generate_feed_stream(request):
+    """
+    Streaming variant of generateFeed.
+    Sends each post as soon as its image and caption are ready, then a final summary record.
+    NDJSON by default; Server-Sent Events with ?format=sse or Accept: text/event-stream.
+    Records: {"type": "post", "index", "post"} ... {"type": "summary", "topic", "count", "cached", "partial"}
+    With deadline (seconds), the summary is sent once time runs out, with partial true.
+    Shares feed_flight with generateFeed: a request that finds the topic already being
+    generated waits for that generation and then streams its posts in one go.
+    """
+    # Plain Django view: DRF content negotiation would reject Accept: text/event-stream
+    try:
+        data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'JSON body must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+
+    topic = data.get('topic')
+    if not topic:
+        return JsonResponse({'error': 'Topic is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    batch_captions = parse_bool(data.get('batchCaptions'))
+    use_cache = parse_bool(data.get('useCache'), default=True)
+    try:
+        deadline_seconds = parse_deadline(data.get('deadline'))
+    except ValueError as e:
+        return JsonResponse(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    use_sse = (
+        request.GET.get('format') == 'sse'
+        or 'text/event-stream' in request.headers.get('Accept', '')
+    )
+
+    def stream():
+        count = 0
         try:
-            image_queries = json.loads(content_text.strip())
-        except json.JSONDecodeError:
-            start = content_text.find('[')
-            end = content_text.rfind(']') + 1
-            if start != -1 and end != 0:
-                image_queries = json.loads(content_text[start:end])
-            else:
-                raise ValueError("Could not parse image queries")
-
-        # STEP 2: Fetch actual images for each query
-        posts = []
-        for query in image_queries[:8]:  # Take first 8
-            source_image_url = None
-
-            # Try Google Image Search
-            google_api_key = os.getenv('GOOGLE_API_KEY')
-            google_search_engine_id = os.getenv('GOOGLE_SEARCH_ENGINE_ID')
-
-            if google_api_key and google_search_engine_id:
+            cached_posts = get_cached_feed(topic) if use_cache else None
+            if cached_posts:
+                for index, post in enumerate(cached_posts):
+                    count += 1
+                    yield format_stream_record({'type': 'post', 'index': index, 'post': post}, use_sse)
+
+                yield format_stream_record({'type': 'summary', 'topic': topic, 'count': count, 'cached': True, 'partial': False}, use_sse)
+                return
+
+            flight_key = normalize_topic(topic)
+            call = feed_flight.claim(flight_key)
+            if call is None:
+                # Already being generated (by generateFeed or another stream): join it
+                feed = get_or_generate_feed(topic, batch_captions=batch_captions, use_cache=False, deadline_seconds=deadline_seconds)
+                for index, post in enumerate(feed['posts']):
+                    count += 1
+                    yield format_stream_record({'type': 'post', 'index': index, 'post': post}, use_sse)
+
+                yield format_stream_record({'type': 'summary', 'topic': topic, 'count': count, 'cached': False, 'partial': feed['partial']}, use_sse)
+                return
+
+            deadline = Deadline(deadline_seconds) if deadline_seconds else None
+            results = {}
+            failures = []
+            # Stays True unless the generation runs to the end (the client can disconnect mid-stream)
+            partial = True
+            try:
                 try:
-                    google_url = f"https://www.googleapis.com/customsearch/v1?q={query}&cx={google_search_engine_id}&key={google_api_key}&searchType=image&num=1&imgSize=large"
-                    google_response = requests.get(google_url, timeout=5)
-
-                    if google_response.status_code == 200:
-                        google_data = google_response.json()
-                        if google_data.get('items'):
-                            source_image_url = google_data['items'][0]['link']
-                            print(f"✓ Found Google Image: {query}")
-                except Exception as e:
-                    print(f"Google Image Search error: {e}")
-
-            # Try Bing if Google failed
-            if not source_image_url:
-                bing_api_key = os.getenv('BING_API_KEY')
-                if bing_api_key:
-                    try:
-                        bing_url = f"https://api.bing.microsoft.com/v7.0/images/search?q={query}&count=1&imageType=Photo&aspect=Wide"
-                        bing_response = requests.get(
-                            bing_url,
-                            headers={'Ocp-Apim-Subscription-Key': bing_api_key},
-                            timeout=5
-                        )
-
-                        if bing_response.status_code == 200:
-                            bing_data = bing_response.json()
-                            if bing_data.get('value'):
-                                source_image_url = bing_data['value'][0]['contentUrl']
-                                print(f"✓ Found Bing Image: {query}")
-                    except Exception as e:
-                        print(f"Bing Image Search error: {e}")
-
-            if not source_image_url:
-                print(f"⚠️ No image found for: {query}, skipping")
-                continue
-
-            # Upload to S3
-            s3_url = upload_image_from_url(source_image_url, query)
-            image_url = s3_url if s3_url else source_image_url
-
-            # STEP 3: Use vision LLM to generate caption based on actual image
-            # Using Claude 3.5 Sonnet with vision (via Bedrock)
-            caption_prompt = f"""You are viewing an educational image about "{topic}".
-The image shows: {query}
-
-Write a short, engaging Instagram-style caption (2-3 sentences) that:
-1. Describes what's in the image
-2. Teaches something interesting about "{topic}"
-3. Is fun and easy to understand
-
-Caption:"""
-
-            # Note: For true vision, we'd send the image. For now, using query as context
-            # To use actual vision, switch to anthropic.claude-3-5-sonnet-20241022-v2:0 with image
-            caption_body = {
-                "prompt": caption_prompt,
-                "max_gen_len": 256,
-                "temperature": 0.7,
-                "top_p": 0.9
-            }
-
-            caption_response = bedrock_runtime.invoke_model(
-                modelId='meta.llama3-70b-instruct-v1:0',
-                body=json.dumps(caption_body)
-            )
+                    for index, post in iter_generated_posts(topic, batch_captions=batch_captions, deadline=deadline, failures=failures):
+                        if not post:
+                            continue
+                        count += 1
+                        results[index] = post
+                        yield format_stream_record({'type': 'post', 'index': index, 'post': post}, use_sse)
+                except DeadlineExceeded as e:
+                    print(f"⏱️ {e} for '{topic}'")
+                    deadline.skipped += 1
+
+                partial = bool(deadline and deadline.partial)
+                # Feeds that lost posts to errors aren't cached either
+                if not partial and not failures:
+                    store_cached_feed(topic, [results[index] for index in sorted(results)])
+            finally:
+                # Requests that joined this generation get whatever was produced
+                feed_flight.finish(flight_key, call, result={
+                    'posts': [results[index] for index in sorted(results)],
+                    'partial': partial
+                })
+            yield format_stream_record({'type': 'summary', 'topic': topic, 'count': count, 'cached': False, 'partial': partial}, use_sse)
+
+        except Exception as e:
+            import traceback
+            print(f"❌ Error in generate_feed_stream: {str(e)}")
+            print(traceback.format_exc())
+            yield format_stream_record({'type': 'error', 'error': str(e), 'count': count}, use_sse)
+
+    response = StreamingHttpResponse(
+        stream(),
+        content_type='text/event-stream' if use_sse else 'application/x-ndjson'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
 
-            caption_body = json.loads(caption_response['body'].read())
-            caption_text = caption_body['generation'].strip()
 
-            posts.append({
-                'text': caption_text,
-                'imageQuery': query,
-                'imageUrl': image_url,
-                'musicUrl': "https://example.com/music/default.mp3",
-                'musicTitle': "Background Music"
-            })
+@api_view(['POST'])
+def generate_feed_job(request):
+    """
+    Job mode for generateFeed: queue the generation and return a job id right away.
+    Poll getFeedJob?jobId=... for status/progress and the posts once it has finished.
+    """
+    try:
+        topic = request.data.get('topic')
+        if not topic:
+            return Response(
+                {'error': 'Topic is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        batch_captions = parse_bool(request.data.get('batchCaptions'))
+        use_cache = parse_bool(request.data.get('useCache'), default=True)
 
-            print(f"✓ Generated caption for: {query}")
+        job_id = submit_feed_job(topic, batch_captions=batch_captions, use_cache=use_cache)
 
         return Response({
-            'topic': topic,
-            'posts': posts
-        }, status=status.HTTP_200_OK)
+            'jobId': job_id,
+            'status': 'queued',
+            'topic': topic
+        }, status=status.HTTP_202_ACCEPTED)
+
+    except JobQueueFull as e:
+        response = Response(
+            {'error': f'Too many feeds are being generated, try again shortly ({e})'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = '5'
+        return response
+
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def get_feed_job_view(request):
+    """
+    Get status, progress and (when succeeded) the result of a feed job
+    """
+    try:
+        job_id = request.query_params.get('jobId')
+
+        if not job_id:
+            return Response(
+                {'error': 'jobId is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job = get_feed_job(job_id)
+
+        if not job:
+            return Response(
+                {'error': 'Job not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response(job, status=status.HTTP_200_OK)
 
     except Exception as e:
-        import traceback
-        print(f"❌ Error in generate_feed: {str(e)}")
-        print(traceback.format_exc())
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -183,6 +297,25 @@ def health_check(request):
     return Response({'status': 'healthy'}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+def cache_stats(request):
+    """Hit/miss counters for the server-side caches, request coalescing, image search latency and connection pools"""
+    return Response({
+        'feed': get_feed_cache_stats(),
+        'image_search': get_image_search_cache_stats(),
+        'image_search_providers': get_image_search_provider_stats(),
+        'liked_posts': get_post_cache_stats(),
+        'study_sets': get_study_cache_stats(),
+        'coalescing': {
+            'generateFeed': feed_flight.stats(),
+            'generateFlashcards': flashcards_flight.stats(),
+            'generateQuiz': quiz_flight.stats()
+        },
+        'aws_clients': get_aws_client_stats(),
+        'http_client': get_http_client_stats()
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 def save_feed_posts(request):
     """
@@ -218,7 +351,9 @@ def save_feed_posts(request):
 @api_view(['GET'])
 def get_feed(request):
     """
-    Get all posts for a user from DynamoDB
+    Get a user's posts from DynamoDB, one page at a time
+    Optional `limit` and `cursor` (the nextCursor of the previous page); pass `viewerId`
+    to get a `liked` flag on each post
     """
     try:
         user_id = request.query_params.get('userId')
@@ -229,12 +364,29 @@ def get_feed(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        posts = get_user_posts(user_id)
+        page = get_user_posts(
+            user_id,
+            request.query_params.get('limit'),
+            request.query_params.get('cursor')
+        )
+        posts = page['posts']
+
+        viewer_id = request.query_params.get('viewerId')
+        if viewer_id:
+            posts = annotate_liked(viewer_id, posts)
 
         return Response({
-            'posts': posts
+            'posts': posts,
+            'has_more': page['has_more'],
+            'nextCursor': page['next_cursor']
         }, status=status.HTTP_200_OK)
 
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -259,17 +411,20 @@ def toggle_like(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # `changed` is False when the post was already in the requested state (counter untouched)
         if action == 'like':
-            like_post(user_id, post_id, post_data)
+            changed = like_post(user_id, post_id, post_data)
             return Response({
                 'message': 'Post liked successfully',
-                'liked': True
+                'liked': True,
+                'changed': changed
             }, status=status.HTTP_200_OK)
         else:
-            unlike_post(user_id, post_id)
+            changed = unlike_post(user_id, post_id, (post_data or {}).get('userId'))
             return Response({
                 'message': 'Post unliked successfully',
-                'liked': False
+                'liked': False,
+                'changed': changed
             }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -282,7 +437,7 @@ def toggle_like(request):
 @api_view(['GET'])
 def get_liked_posts(request):
     """
-    Get all liked posts for a user
+    Get a user's liked posts, one page at a time (optional `limit` and `cursor`)
     """
     try:
         user_id = request.query_params.get('userId')
@@ -293,12 +448,24 @@ def get_liked_posts(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        liked_posts = get_user_likes(user_id)
+        page = get_user_likes(
+            user_id,
+            request.query_params.get('limit'),
+            request.query_params.get('cursor')
+        )
 
         return Response({
-            'posts': liked_posts
+            'posts': page['posts'],
+            'has_more': page['has_more'],
+            'nextCursor': page['next_cursor']
         }, status=status.HTTP_200_OK)
 
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     except Exception as e:
         import traceback
         print(f"❌ Error in get_liked_posts: {str(e)}")
@@ -312,7 +479,7 @@ def get_liked_posts(request):
 @api_view(['GET'])
 def get_topics(request):
     """
-    Get all topics for a user from DynamoDB
+    Get a user's topics from DynamoDB, most recent first (optional `limit` and `cursor`)
     """
     try:
         user_id = request.query_params.get('userId')
@@ -323,12 +490,24 @@ def get_topics(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        topics = get_user_topics(user_id)
+        page = get_user_topics(
+            user_id,
+            request.query_params.get('limit'),
+            request.query_params.get('cursor')
+        )
 
         return Response({
-            'topics': topics
+            'topics': page['topics'],
+            'has_more': page['has_more'],
+            'nextCursor': page['next_cursor']
         }, status=status.HTTP_200_OK)
 
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -339,7 +518,8 @@ def get_topics(request):
 @api_view(['GET'])
 def get_feed_by_topic(request):
     """
-    Get all posts for a specific topic/feed
+    Get the posts for a specific topic/feed, one page at a time (optional `limit` and `cursor`)
+    Pass `viewerId` to get a `liked` flag on each post
     """
     try:
         user_id = request.query_params.get('userId')
@@ -351,13 +531,31 @@ def get_feed_by_topic(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        posts = get_posts_by_topic(user_id, topic)
+        page = get_posts_by_topic(
+            user_id,
+            topic,
+            request.query_params.get('limit'),
+            request.query_params.get('cursor')
+        )
+        posts = page['posts']
+
+        viewer_id = request.query_params.get('viewerId')
+        if viewer_id:
+            posts = annotate_liked(viewer_id, posts)
 
         return Response({
             'topic': topic,
-            'posts': posts
+            'posts': posts,
+            'has_more': page['has_more'],
+            'nextCursor': page['next_cursor']
         }, status=status.HTTP_200_OK)
 
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -398,20 +596,49 @@ def delete_feed_by_topic(request):
 def get_public_feed_view(request):
     """
     Get all public posts from all users (social feed) with pagination
+    Pass `cursor` (empty for the first page) for newest-first cursor pagination from the
+    public-feed index; otherwise the shuffled limit/offset/seed pagination is used
+    (a stable order per seed over a periodically refreshed snapshot of public posts).
+    Pass `viewerId` to get a `liked` flag on each post.
     """
     try:
+        viewer_id = request.query_params.get('viewerId')
+
+        if 'cursor' in request.query_params:
+            try:
+                page = get_public_feed_page(
+                    request.query_params.get('limit', 10),
+                    request.query_params.get('cursor') or None
+                )
+            except ValueError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            posts = annotate_liked(viewer_id, page['posts']) if viewer_id else page['posts']
+
+            return Response({
+                'posts': posts,
+                'count': len(posts),
+                'has_more': page['has_more'],
+                'nextCursor': page['next_cursor']
+            }, status=status.HTTP_200_OK)
+
         limit = int(request.query_params.get('limit', 10))
         offset = int(request.query_params.get('offset', 0))
         seed = request.query_params.get('seed')  # For consistent randomization
 
         result = get_public_feed(limit, offset, seed)
+        posts = annotate_liked(viewer_id, result['posts']) if viewer_id else result['posts']
 
         return Response({
-            'posts': result['posts'],
+            'posts': posts,
             'count': len(result['posts']),
             'total': result['total'],
             'has_more': result['has_more'],
-            'offset': offset
+            'offset': offset,
+            'snapshot': result['snapshot']
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -441,6 +668,11 @@ def update_feed_privacy_view(request):
             )
 
         result = update_feed_privacy(user_id, topic, is_private)
+        if result is None:
+            return Response(
+                {'error': f'Feed "{topic}" not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
         return Response({
             'message': f'Feed "{topic}" privacy updated',
@@ -467,7 +699,10 @@ def upload_image(request):
             return Response({'error': 'userId and image file are required'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        s3_url = upload_image_file(image_file, user_id)
+        try:
+            s3_url = upload_image_file(image_file, user_id)
+        except UnsupportedImage as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         if not s3_url:
             return Response({'error': 'Failed to upload to S3'},
@@ -482,10 +717,65 @@ def upload_image(request):
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+def create_upload(request):
+    """
+    Presigned POST for uploading an image straight to S3.
+    The client posts 'fields' plus the file to 'url', then passes 'key' to completeUpload
+    (or to generateFlashcards / generateQuiz).
+    """
+    try:
+        user_id = request.data.get('userId')
+        content_type = request.data.get('contentType', 'image/jpeg')
+
+        if not user_id:
+            return Response({'error': 'userId is required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = create_presigned_upload(user_id, content_type)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(upload, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        print(f"❌ Create upload error: {e}")
+        return Response({'error': str(e)},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def complete_upload(request):
+    """
+    Confirm a direct upload from createUpload and return its public URL.
+    """
+    try:
+        user_id = request.data.get('userId')
+        key = request.data.get('key')
+
+        if not user_id or not key:
+            return Response({'error': 'userId and key are required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            s3_url = complete_presigned_upload(user_id, key)
+        except (ValueError, UnsupportedImage) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'message': '✅ Upload successful', 'url': s3_url},
+                        status=status.HTTP_200_OK)
+
+    except Exception as e:
+        print(f"❌ Complete upload error: {e}")
+        return Response({'error': str(e)},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['GET'])
 def get_saved_flashcards(request):
     """
-    Get all saved flashcard sets for a user
+    Get a user's saved flashcard sets, most recent first (optional `limit` and `cursor`)
     """
     try:
         user_id = request.query_params.get('userId')
@@ -496,12 +786,24 @@ def get_saved_flashcards(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        flashcards = get_user_flashcards(user_id)
+        page = get_user_flashcards(
+            user_id,
+            request.query_params.get('limit'),
+            request.query_params.get('cursor')
+        )
         
         return Response({
-            'flashcards': flashcards
+            'flashcards': page['flashcards'],
+            'has_more': page['has_more'],
+            'nextCursor': page['next_cursor']
         }, status=status.HTTP_200_OK)
         
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     except Exception as e:
         print(f"❌ Error in get_saved_flashcards: {str(e)}")
         return Response(
@@ -581,7 +883,7 @@ def delete_flashcard_set_view(request):
 @api_view(['GET'])
 def get_saved_quizzes(request):
     """
-    Get all saved quiz sets for a user
+    Get a user's saved quiz sets, most recent first (optional `limit` and `cursor`)
     """
     try:
         user_id = request.query_params.get('userId')
@@ -592,12 +894,24 @@ def get_saved_quizzes(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        quizzes = get_user_quizzes(user_id)
+        page = get_user_quizzes(
+            user_id,
+            request.query_params.get('limit'),
+            request.query_params.get('cursor')
+        )
         
         return Response({
-            'quizzes': quizzes
+            'quizzes': page['quizzes'],
+            'has_more': page['has_more'],
+            'nextCursor': page['next_cursor']
         }, status=status.HTTP_200_OK)
         
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     except Exception as e:
         print(f"❌ Error in get_saved_quizzes: {str(e)}")
         return Response(
@@ -15,7 +15,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quickly_backend.settings')
 django.setup()
 
 from api.polly_service import should_generate_audio
-from api.views import bedrock_runtime
+from api.feed_service import bedrock_runtime
 import boto3
 
 def test_feed_generation():
@@ -6,7 +6,7 @@ Usage: python view_user_data.py <firebase-user-id>
 
 import sys
 import json
-from api.dynamodb_service import get_user_posts, get_user_topics, get_user_likes
+from api.dynamodb_service import iter_user_posts, iter_user_topics, iter_user_likes
 
 def main():
     if len(sys.argv) < 2:
@@ -22,7 +22,7 @@ def main():
     print("=" * 60)
     print("📝 POSTS:")
     print("=" * 60)
-    posts = get_user_posts(user_id)
+    posts = list(iter_user_posts(user_id))
 
     if posts:
         for i, post in enumerate(posts, 1):
@@ -42,7 +42,7 @@ def main():
     print("\n" + "=" * 60)
     print("📚 TOPICS:")
     print("=" * 60)
-    topics = get_user_topics(user_id)
+    topics = list(iter_user_topics(user_id))
 
     if topics:
         for i, topic in enumerate(topics, 1):
@@ -56,7 +56,7 @@ def main():
     print("\n" + "=" * 60)
     print("❤️  LIKED POSTS:")
     print("=" * 60)
-    liked_posts = get_user_likes(user_id)
+    liked_posts = list(iter_user_likes(user_id))
 
     if liked_posts:
         for i, post in enumerate(liked_posts, 1):